@@ -1,11 +1,13 @@
-from .coordinator import CoordinatorAgent
-from .interviewer import InterviewerAgent
-from .observer import ObserverAgent
-from .feedback_generator import FeedbackGenerator
-
-__all__ = [
-    'CoordinatorAgent',
-    'InterviewerAgent',
-    'ObserverAgent',
-    'FeedbackGenerator'
+from .coordinator import CoordinatorAgent
+from .interviewer import InterviewerAgent
+from .observer import ObserverAgent
+from .feedback_generator import FeedbackGenerator
+from .observer_coordinator import ObserverCoordinatorAgent
+
+__all__ = [
+    'CoordinatorAgent',
+    'InterviewerAgent',
+    'ObserverAgent',
+    'FeedbackGenerator',
+    'ObserverCoordinatorAgent'
 ]
\ No newline at end of file
@@ -0,0 +1,71 @@
+from functools import lru_cache
+from typing import Sequence, Tuple
+import json
+import httpx
+from langchain_core.messages import BaseMessage
+from langchain_mistralai import ChatMistralAI
+from config.settings import settings
+
+# Для проверки, что в потоке уже пришел целый JSON-объект (переносы строк внутри строк допускаются)
+_JSON_DECODER = json.JSONDecoder(strict=False)
+
+# Лимиты общего пула соединений с Mistral API (max_connections совпадает с max_concurrent_requests клиента)
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+
+@lru_cache(maxsize=None)
+def shared_http_clients(endpoint: str, api_key: str, timeout: float) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Синхронный и асинхронный HTTP-клиенты с keep-alive, общие для всех LLM с теми же параметрами"""
+    params = dict(
+        base_url=endpoint,
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        },
+        timeout=timeout,
+        limits=HTTP_POOL_LIMITS,
+    )
+    return httpx.Client(**params), httpx.AsyncClient(**params)
+
+
+def create_llm(temperature: float, **kwargs) -> ChatMistralAI:
+    """ChatMistralAI из настроек, работающий через общий пул соединений.
+
+    ChatMistralAI 0.1 не принимает готовый HTTP-клиент и создает свою пару клиентов
+    в валидаторе, поэтому после создания клиенты заменяются общими.
+    """
+    llm = ChatMistralAI(
+        model=settings.MISTRAL_MODEL,
+        temperature=temperature,
+        api_key=settings.MISTRAL_API_KEY,
+        **kwargs
+    )
+    llm.client, llm.async_client = shared_http_clients(
+        llm.endpoint, llm.mistral_api_key.get_secret_value(), llm.timeout
+    )
+    return llm
+
+
+async def astream_json_response(llm: ChatMistralAI, formatted_prompt: Sequence[BaseMessage]) -> str:
+    """Читает ответ LLM потоком и прекращает чтение, как только пришел целый JSON-объект"""
+    chunks = []
+    async for chunk in llm.astream(formatted_prompt):
+        chunks.append(chunk.content)
+        
+        if "}" not in chunk.content:
+            continue
+        
+        content = "".join(chunks)
+        start = content.find("{")
+        if start < 0 or content.count("{") != content.count("}"):
+            continue
+        
+        try:
+            _, end = _JSON_DECODER.raw_decode(content, start)
+        except ValueError:
+            continue
+        # Остаток генерации (пояснения после JSON) не ждем
+        return content[start:end]
+    
+    return "".join(chunks)
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import List, Optional, Union
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+# Разделитель статической и динамической части в prompts/*.txt
+DYNAMIC_MARKER = "{# DYNAMIC #}"
+
+
+class FastPromptTemplate:
+    """Промпт из неизменного system-сообщения и human-части с простыми подстановками {name}.
+
+    System-сообщение собирается один раз, human-часть форматируется через str.format_map -
+    без разбора шаблона и пересборки сообщений ChatPromptTemplate на каждом вызове.
+    Отсутствующие переменные подставляются пустой строкой.
+    """
+
+    def __init__(self, static_text: Optional[str], dynamic_text: str):
+        # format() без аргументов только раскрывает экранирование {{ }}
+        self.system_message = SystemMessage(content=static_text.format()) if static_text else None
+        self.dynamic_text = dynamic_text
+
+    def format_messages(self, **kwargs) -> List[BaseMessage]:
+        human_message = HumanMessage(content=self.dynamic_text.format_map(defaultdict(str, kwargs)))
+        if self.system_message is None:
+            return [human_message]
+        return [self.system_message, human_message]
+
+
+PromptTemplate = Union[FastPromptTemplate, ChatPromptTemplate]
+
+
+def _template_fields(text: str) -> Optional[list]:
+    """Подстановки шаблона как (имя, формат, конверсия); None, если шаблон не разбирается"""
+    try:
+        return [
+            (field_name, format_spec, conversion)
+            for _, field_name, format_spec, conversion in Formatter().parse(text)
+            if field_name is not None
+        ]
+    except ValueError:
+        return None
+
+
+def build_prompt_template(template_content: str) -> PromptTemplate:
+    """Строит промпт из текста шаблона.
+
+    Все, что до маркера DYNAMIC_MARKER, становится system-сообщением без переменных:
+    этот префикс одинаков во всех вызовах, и провайдер может переиспользовать его кэш.
+    Все, что после маркера, - human-сообщение с данными конкретного вызова.
+    """
+    static_part, marker, dynamic_part = template_content.partition(DYNAMIC_MARKER)
+    if not marker:
+        static_part, dynamic_part = "", template_content
+    static_part, dynamic_part = static_part.strip(), dynamic_part.strip()
+
+    # Быстрый путь годится, если в статической части нет переменных,
+    # а в динамической - только простые {name} без атрибутов, индексов и форматов
+    static_fields = _template_fields(static_part)
+    dynamic_fields = _template_fields(dynamic_part)
+    if static_fields == [] and dynamic_fields is not None and all(
+        name.isidentifier() and not format_spec and conversion is None
+        for name, format_spec, conversion in dynamic_fields
+    ):
+        return FastPromptTemplate(static_part, dynamic_part)
+
+    if not marker:
+        return ChatPromptTemplate.from_template(template_content)
+
+    return ChatPromptTemplate.from_messages([
+        ("system", static_part),
+        ("human", dynamic_part)
+    ])
+
+
+@lru_cache(maxsize=None)
+def load_prompt_template(filename: str) -> PromptTemplate:
+    """Загружает шаблон из prompts/. Файл читается один раз за процесс."""
+    template_path = PROMPTS_DIR / filename
+
+    if not template_path.exists():
+        raise FileNotFoundError(f"Prompt template not found: {template_path}")
+
+    template_content = template_path.read_text(encoding='utf-8')
+    return build_prompt_template(template_content)
+
+
+# Прогреваем кэш при импорте, чтобы первый вызов агента не ждал чтения с диска
+for _filename in ("coordinator.txt", "interviewer.txt", "feedback.txt", "analyze_and_decide.txt"):
+    load_prompt_template(_filename)
\ No newline at end of file
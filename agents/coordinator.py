@@ -1,149 +1,186 @@
-from typing import Dict, Any, List
-import json
-from pathlib import Path
-from langchain_mistralai import ChatMistralAI
-from langchain_core.prompts import ChatPromptTemplate
-from config.settings import settings
-from core.state import InterviewState, CandidateInfo
-from core.state import StateManager
-from core.state import Assessment
-
-class CoordinatorAgent:
-    def __init__(self, llm: ChatMistralAI = None):
-        self.llm = llm or ChatMistralAI(
-            model=settings.MISTRAL_MODEL,
-            temperature=0.3,
-            api_key=settings.MISTRAL_API_KEY
-        )
-        
-        self.prompt_template = self._load_prompt_template("coordinator.txt")
-    
-    def _load_prompt_template(self, filename: str) -> ChatPromptTemplate:
-        current_dir = Path(__file__).parent
-        template_path = current_dir.parent / "prompts" / filename
-        
-        if not template_path.exists():
-            raise FileNotFoundError(f"Prompt template not found: {template_path}")
-        
-        template_content = template_path.read_text(encoding='utf-8')
-        return ChatPromptTemplate.from_template(template_content)
-    
-    def decide_next_step(self, state: InterviewState) -> Dict[str, Any]:
-        """Принимает решение о следующем шаге интервью"""
-        
-        candidate_info = state["candidate_info"]
-        technologies = getattr(candidate_info, 'technologies', [])
-        
-        if isinstance(technologies, list):
-            technologies_str = ", ".join(technologies)
-        else:
-            technologies_str = str(technologies)
-        
-        assessment = state.get("assessment", Assessment())
-        current_score = getattr(assessment, 'technical_score', 0)
-        
-        prompt_data = {
-            "candidate_name": candidate_info.name,
-            "position": candidate_info.position,
-            "grade": candidate_info.grade,
-            "experience_years": candidate_info.experience_years,
-            "technologies": technologies_str,
-            "history": self._get_conversation_history(state, 4),
-            "current_topic": state.get("current_topic", "Нет темы"),
-            "difficulty": state.get("difficulty_level", 2),
-            "questions_count": len(state.get("questions_asked", [])),
-            "max_turns": settings.MAX_TURNS,
-            "current_score": round(current_score, 1),
-            "observer_notes": state.get("observer_recommendation", "Нет заметок")
-        }
-        
-        formatted_prompt = self.prompt_template.format(**prompt_data)
-        
-        try:
-            response = self.llm.invoke(formatted_prompt)
-            content = response.content.strip()
-            
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            # управляющие символы
-            content = content.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-            
-            decision = json.loads(content)
-            
-            if decision.get("action") not in ["continue", "change_topic", "end_interview"]:
-                decision["action"] = "continue"
-            
-            decision.setdefault("reasoning", "Продолжаем интервью")
-            decision.setdefault("instruction_to_interviewer", "Задай следующий вопрос")
-            
-            return decision
-            
-        except (json.JSONDecodeError, AttributeError) as e:
-            # Fallback решение
-            return self._create_fallback_decision(state)
-        except Exception as e:
-            return self._create_fallback_decision(state)
-
-    def _create_fallback_decision(self, state: InterviewState) -> Dict[str, Any]:
-        """Создает fallback решение"""
-        questions_count = len(state.get("questions_asked", []))
-        
-        if questions_count >= settings.MAX_TURNS:
-            action = "end_interview"
-            reasoning = "Достигнут лимит вопросов"
-        elif questions_count >= 5 and state.get("assessment", {}).get("technical_score", 0) > 7:
-            action = "end_interview"
-            reasoning = "Кандидат демонстрирует высокий уровень"
-        else:
-            action = "continue"
-            reasoning = "Продолжаем интервью (fallback)"
-        
-        return {
-            "action": action,
-            "new_topic": state.get("current_topic", "Python"),
-            "new_difficulty": state.get("difficulty_level", 2),
-            "reasoning": reasoning,
-            "instruction_to_interviewer": "Задай следующий вопрос"
-        }
-    
-    def should_end_interview(self, state: InterviewState) -> bool:
-        """Проверяет, нужно ли завершить интервью"""
-        if state.get("interview_complete", False):
-            return True
-        
-        questions_count = len(state.get("questions_asked", []))
-        
-        if questions_count >= settings.MAX_TURNS:
-            print(f"Достигнут лимит вопросов: {questions_count}/{settings.MAX_TURNS}")
-            return True
-        
-        # Проверяем, достаточно ли данных для оценки (если есть оценка)
-        assessment = state.get("assessment")
-        if assessment and hasattr(assessment, 'technical_score'):
-            if questions_count >= 5 and assessment.technical_score > 7:
-                print(f"Кандидат демонстрирует высокий уровень: {assessment.technical_score}/10")
-                return True
-        
-        return False
-    
-    def _get_conversation_history(self, state: InterviewState, last_n: int = 4) -> str:
-        """Получает историю диалога для промпта"""
-        messages = state.get("messages", [])
-        if not messages:
-            return "Нет истории диалога"
-        
-        history = []
-        for msg in messages[-last_n:]:
-            if hasattr(msg, 'role') and hasattr(msg, 'content'):
-                role = "Интервьюер" if msg.role == "interviewer" else "Кандидат"
-                history.append(f"{role}: {msg.content}")
-            else:
-                # Если это словарь -> проверяем структуру
-                if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                    role = "Интервьюер" if msg['role'] == "interviewer" else "Кандидат"
-                    history.append(f"{role}: {msg['content']}")
-        
-        return "\n".join(history)
\ No newline at end of file
+from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from langchain_mistralai import ChatMistralAI
+from agents._http import astream_json_response, create_llm
+from pydantic import BaseModel, ValidationError, ValidationInfo, field_validator
+from agents._templates import load_prompt_template
+from config.settings import settings
+from core.state import InterviewState
+from core.llm_cache import SemanticLLMCache
+from core.state import StateManager
+from core.state import Assessment
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число закэшированных решений координатора
+DECISION_CACHE_SIZE = 512
+
+# Тело блока ```json ... ``` (или просто ``` ... ```) в ответе LLM
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+# Управляющие символы заменяем пробелами за один проход
+_CONTROL_CHARS = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+COORDINATOR_ACTIONS = ("continue", "change_topic", "end_interview")
+
+
+class CoordinatorDecision(BaseModel):
+    """Решение координатора в том виде, в каком его возвращает LLM"""
+    action: str = "continue"
+    new_topic: Optional[str] = ""
+    new_difficulty: Optional[int] = None
+    reasoning: Optional[str] = "Продолжаем интервью"
+    instruction_to_interviewer: Optional[str] = "Задай следующий вопрос"
+    
+    @field_validator("action", mode="before")
+    @classmethod
+    def _known_action(cls, value: Any) -> str:
+        # Неизвестное действие не ошибка - просто продолжаем интервью
+        return value if value in COORDINATOR_ACTIONS else "continue"
+    
+    @field_validator("new_difficulty", mode="before")
+    @classmethod
+    def _lenient_difficulty(cls, value: Any) -> Optional[int]:
+        # В промптах это "number": дробная или строковая сложность округляется, мусор - None,
+        # чтобы из-за необязательного поля не отбрасывался весь ответ
+        if isinstance(value, bool):
+            return None
+        try:
+            return min(5, max(1, round(float(value))))
+        except (TypeError, ValueError, OverflowError):
+            return None
+    
+    @field_validator("new_topic", "reasoning", "instruction_to_interviewer", mode="before")
+    @classmethod
+    def _null_to_default(cls, value: Any, info: ValidationInfo) -> Any:
+        # Необязательные поля модель часто возвращает как null - берем значение по умолчанию
+        return cls.model_fields[info.field_name].default if value is None else value
+
+
+class CoordinatorAgent:
+    def __init__(self, llm: ChatMistralAI = None, llm_cache: SemanticLLMCache = None):
+        self.llm = llm or create_llm(temperature=0.3)
+        # Общий кэш ответов LLM (None - не кэшировать)
+        self.llm_cache = llm_cache
+        
+        self.prompt_template = load_prompt_template("coordinator.txt")
+        
+        # Кэш решений: хэш prompt_data -> разобранное решение
+        self._decision_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    def decide_next_step(self, state: InterviewState) -> Dict[str, Any]:
+        """Синхронная обертка над adecide_next_step"""
+        return asyncio.run(self.adecide_next_step(state))
+    
+    async def adecide_next_step(self, state: InterviewState) -> Dict[str, Any]:
+        """Принимает решение о следующем шаге интервью"""
+        
+        prompt_data = self.build_prompt_data(state)
+        
+        # Одинаковое состояние дает одинаковый промпт - повторно LLM не вызываем
+        cache_key = hashlib.blake2b(
+            json.dumps(prompt_data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        cached_decision = self._decision_cache.get(cache_key)
+        if cached_decision is not None:
+            self._decision_cache.move_to_end(cache_key)
+            return dict(cached_decision)
+        
+        formatted_prompt = self.prompt_template.format_messages(**prompt_data)
+        
+        try:
+            raw_content = self.llm_cache.get(self.llm, formatted_prompt, semantic=False) if self.llm_cache else None
+            if raw_content is None:
+                raw_content = await astream_json_response(self.llm, formatted_prompt)
+            content = raw_content.strip()
+            
+            fence = _FENCE_RE.search(content)
+            if fence:
+                content = fence.group(1)
+            
+            # управляющие символы
+            content = content.translate(_CONTROL_CHARS)
+            
+            # Разбор JSON, проверка типов и значения по умолчанию - за один вызов
+            decision = CoordinatorDecision.model_validate_json(content).model_dump()
+            if self.llm_cache:
+                self.llm_cache.set(self.llm, formatted_prompt, raw_content, semantic=False)
+            
+            self._decision_cache[cache_key] = decision
+            if len(self._decision_cache) > DECISION_CACHE_SIZE:
+                self._decision_cache.popitem(last=False)
+            
+            return dict(decision)
+            
+        except (ValidationError, AttributeError) as e:
+            # Fallback решение
+            return self._create_fallback_decision(state)
+        except Exception as e:
+            return self._create_fallback_decision(state)
+    
+    def build_prompt_data(self, state: InterviewState) -> Dict[str, Any]:
+        """Данные состояния интервью для промпта координатора"""
+        candidate_info = state["candidate_info"]
+        
+        assessment = state.get("assessment", Assessment())
+        current_score = getattr(assessment, 'technical_score', 0)
+        
+        return {
+            "candidate_profile": candidate_info.profile_str,
+            "history": StateManager.get_conversation_history(state, 4) or "Нет истории диалога",
+            "current_topic": state.get("current_topic", "Нет темы"),
+            "difficulty": state.get("difficulty_level", 2),
+            "questions_count": len(state.get("questions_asked", [])),
+            "max_turns": settings.MAX_TURNS,
+            "current_score": round(current_score, 1),
+            "observer_notes": state.get("observer_recommendation", "Нет заметок")
+        }
+    
+    def _create_fallback_decision(self, state: InterviewState) -> Dict[str, Any]:
+        """Создает fallback решение"""
+        questions_count = len(state.get("questions_asked", []))
+        
+        if questions_count >= settings.MAX_TURNS:
+            action = "end_interview"
+            reasoning = "Достигнут лимит вопросов"
+        elif questions_count >= 5 and getattr(state.get("assessment"), "technical_score", 0) > 7:
+            action = "end_interview"
+            reasoning = "Кандидат демонстрирует высокий уровень"
+        else:
+            action = "continue"
+            reasoning = "Продолжаем интервью (fallback)"
+        
+        return {
+            "action": action,
+            "new_topic": state.get("current_topic", "Python"),
+            "new_difficulty": state.get("difficulty_level", 2),
+            "reasoning": reasoning,
+            "instruction_to_interviewer": "Задай следующий вопрос"
+        }
+    
+    def should_end_interview(self, state: InterviewState) -> bool:
+        """Проверяет, нужно ли завершить интервью"""
+        if state.get("interview_complete", False):
+            return True
+        
+        questions_count = len(state.get("questions_asked", ()))
+        max_turns = settings.MAX_TURNS
+        
+        if questions_count >= max_turns:
+            logger.info("Достигнут лимит вопросов: %s/%s", questions_count, max_turns)
+            return True
+        
+        # Оценку смотрим, только если вопросов уже достаточно для вывода
+        if questions_count < 5:
+            return False
+        
+        technical_score = getattr(state.get("assessment"), "technical_score", None)
+        if technical_score is not None and technical_score > 7:
+            logger.info("Кандидат демонстрирует высокий уровень: %s/10", technical_score)
+            return True
+        
+        return False
@@ -1,278 +1,527 @@
-import time
-from typing import Dict, Any, Tuple
-import json
-from pathlib import Path
-from langchain_mistralai import ChatMistralAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from config.settings import settings
-from core.state import InterviewState, Assessment
-from core.rag import KnowledgeBase
-
-class ObserverAgent:
-    def __init__(self, llm: ChatMistralAI = None, knowledge_base: KnowledgeBase = None):
-        self.llm = llm or ChatMistralAI(
-            model=settings.MISTRAL_MODEL,
-            temperature=0.2,
-            api_key=settings.MISTRAL_API_KEY,
-            timeout=30, 
-            max_retries=3 
-        )
-        
-        self.knowledge_base = knowledge_base or KnowledgeBase()
-        self.prompt_template = self._load_prompt_template()
-    
-    def _load_prompt_template(self) -> ChatPromptTemplate:
-        current_dir = Path(__file__).parent
-        template_path = current_dir.parent / "prompts" / "observer.txt"
-        
-        if not template_path.exists():
-            # Fallback на простой промпт
-            print(f"Файл промпта не найден: {template_path}")
-            return ChatPromptTemplate.from_template("""
-            Проанализируй ответ кандидата на технический вопрос.
-            
-            Тема: {current_topic}
-            Ожидаемый уровень: {expected_level}
-            Вопрос: {question}
-            Ответ кандидата: {answer}
-            
-            Проверка знаний: {knowledge_check_result}
-            
-            Верни ответ в формате JSON:
-            {{
-                "technical_score": число от 0 до 10,
-                "completeness_score": число от 0 до 10,
-                "confidence_score": число от 0 до 10,
-                "communication_score": число от 0 до 10,
-                "has_errors": true/false,
-                "errors_list": ["ошибка1", "ошибка2"],
-                "is_evasive": true/false,
-                "depth_of_knowledge": "shallow/adequate/deep",
-                "recommendation_for_next_question": "текст рекомендации",
-                "suggested_correction": "правильный ответ если есть ошибки"
-            }}
-            """)
-        
-        template_content = template_path.read_text(encoding='utf-8')
-        return ChatPromptTemplate.from_template(template_content)
-    
-    def analyze_answer(self, state: InterviewState, 
-              question: str, answer: str) -> Tuple[Dict, Assessment]:
-        """Анализирует ответ кандидата и обновляет оценку"""
-        
-        print(f"\n Observer: Начинаю анализ...")
-        print(f"   Получен вопрос: {'ДА' if question else 'НЕТ'} (длина: {len(question) if question else 0})")
-        print(f"   Получен ответ: {'ДА' if answer else 'НЕТ'} (длина: {len(answer) if answer else 0})")
-        
-        if not question or not answer:
-            print("Пропускаю анализ: нет вопроса или ответа")
-            return self._create_empty_analysis(), state["assessment"]
-        
-        # Убедимся, что ответ не слишком длинный для API
-        if len(answer) > 4000:
-            answer = answer[:4000] + "... [ответ обрезан]"
-        
-        # Проверяем ответ через RAG (если включено)
-        if settings.RAG_ENABLED:
-            try:
-                verification = self.knowledge_base.verify_technical_answer(
-                    question=question,
-                    answer=answer,
-                    topic=state.get("current_topic", "python")
-                )
-            except Exception as e:
-                pass
-        else:
-            verification = {
-                "is_correct": None,
-                "confidence": 0.5,
-                "correct_info": "RAG отключен",
-                "suggested_topics": []
-            }
-        
-        # Пытаемся получить анализ от LLM
-        analysis = None
-        try:
-            print(f"Анализ через LLM...")
-            
-            # Форматируем промпт
-            formatted_prompt = self.prompt_template.format(
-                current_topic=state.get("current_topic", "Неизвестно"),
-                expected_level=state["candidate_info"].grade,
-                question=question,
-                answer=answer,
-                knowledge_check_result=f"Проверка: {verification['confidence']:.2f} уверенности. {verification['correct_info']}"
-            )
-            
-            # Упрощенный вызов LLM
-            response = self.llm.invoke(formatted_prompt)
-            
-            # Очищаем и парсим JSON ответ
-            content = self._clean_json_response(response.content)
-            analysis = json.loads(content)
-            print(f"Анализ получен. Оценка: {analysis.get('technical_score', 0)}/10")
-            
-        except json.JSONDecodeError as e:
-            print(f"Ошибка парсинга JSON: {e}")
-            print(f"Сырой ответ: {response.content[:200] if 'response' in locals() else 'Нет ответа'}...")
-            analysis = self._fallback_analysis(answer, verification)
-            
-        except Exception as e:
-            print(f"Ошибка запроса к LLM: {e}")
-            analysis = self._fallback_analysis(answer, verification)
-        
-        # Обновляем общую оценку
-        updated_assessment = self._update_assessment(state["assessment"], analysis, verification)
-        
-        return analysis, updated_assessment
-
-    def _clean_json_response(self, text: str) -> str:
-        """Очищает JSON ответ от управляющих символов и извлекает JSON"""
-        if not text:
-            return '{"technical_score": 5, "completeness_score": 5, "confidence_score": 5, "communication_score": 5, "has_errors": false, "errors_list": [], "is_evasive": false, "depth_of_knowledge": "adequate", "recommendation_for_next_question": "Продолжить тему", "suggested_correction": ""}'
-        
-        import re
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-        
-        # Убедимся, что это валидный JSON
-        try:
-            json.loads(text)
-            return text
-        except:
-            import json
-            json_pattern = r'\{.*\}'
-            matches = re.search(json_pattern, text, re.DOTALL)
-            if matches:
-                return matches.group(0)
-            
-            # Fallback - создаем простой JSON
-            return json.dumps({
-                "technical_score": 5,
-                "completeness_score": 5,
-                "confidence_score": 5,
-                "communication_score": 5,
-                "has_errors": False,
-                "errors_list": [],
-                "is_evasive": False,
-                "depth_of_knowledge": "adequate",
-                "recommendation_for_next_question": "Продолжить тему",
-                "suggested_correction": ""
-            })
-    
-    def _create_empty_analysis(self) -> Dict:
-        """Создает пустой анализ при отсутствии данных"""
-        return {
-            "technical_score": 0,
-            "completeness_score": 0,
-            "confidence_score": 0,
-            "communication_score": 5,
-            "has_errors": False,
-            "errors_list": [],
-            "is_evasive": False,
-            "depth_of_knowledge": "unknown",
-            "recommendation_for_next_question": "Продолжить тему",
-            "suggested_correction": ""
-        }
-    
-    def _fallback_analysis(self, answer: str, verification: Dict) -> Dict:
-        """Fallback анализ если LLM не сработал"""
-        answer_lower = answer.lower().strip()
-        answer_length = len(answer.split())
-        
-        # Проверяем короткие/пустые ответы
-        short_responses = ["ничем", "не знаю", "не помню", "нет", "не", "no", "don't know"]
-        
-        if answer_lower in short_responses or answer_length <= 2:
-            return {
-                "technical_score": 1,
-                "completeness_score": 1,
-                "confidence_score": 2,
-                "communication_score": 3,
-                "has_errors": True,
-                "errors_list": ["Слишком краткий ответ", "Не показано понимание темы"],
-                "is_evasive": True,
-                "depth_of_knowledge": "shallow",
-                "recommendation_for_next_question": "Задать более простой вопрос по той же теме или уточняющий вопрос",
-                "suggested_correction": "Списки изменяемы (mutable), кортежи неизменяемы (immutable). Списки используют [], кортежи используют (). Пример использования списка: для хранения элементов, которые могут изменяться. Пример использования кортежа: для координат (x, y) или константных данных."
-            }
-        
-        # Обычная эвристика для более длинных ответов
-        if answer_length < 15:
-            score = 3
-            confidence = 3
-            is_evasive = True
-        elif answer_length > 100:
-            score = 7
-            confidence = 8
-            is_evasive = False
-        else:
-            score = 5
-            confidence = 5
-            is_evasive = False
-        
-        return {
-            "technical_score": score,
-            "completeness_score": score,
-            "confidence_score": confidence,
-            "communication_score": 5,
-            "has_errors": verification.get("confidence", 0.5) < 0.4,
-            "errors_list": ["Неполный ответ"] if answer_length < 25 else [],
-            "is_evasive": is_evasive,
-            "depth_of_knowledge": "adequate" if score > 6 else "shallow",
-            "recommendation_for_next_question": "Продолжить тему" if score > 5 else "Упростить вопрос",
-            "suggested_correction": verification.get("correct_info", "")
-        }
-    
-    def _update_assessment(self, assessment: Assessment, 
-                          analysis: Dict, verification: Dict) -> Assessment:
-        """Обновляет общую оценку на основе анализа ответа"""
-        
-        # Обновляем технические баллы
-        assessment.technical_score = (
-            assessment.technical_score * 0.7 + analysis["technical_score"] * 0.3
-        )
-        
-        # Обновляем оценку коммуникации
-        assessment.communication_score = (
-            assessment.communication_score * 0.7 + analysis["communication_score"] * 0.3
-        )
-        
-        # Обновляем уверенность
-        assessment.confidence_score = (
-            assessment.confidence_score * 0.7 + analysis["confidence_score"] * 0.3
-        )
-        
-        # Добавляем пробелы в знаниях если есть ошибки
-        if analysis["has_errors"] and analysis.get("suggested_correction"):
-            topic = "текущая тема"
-            assessment.knowledge_gaps[topic] = analysis["suggested_correction"][:200]
-        
-        # Добавляем заметки по софт скиллам
-        if analysis["is_evasive"]:
-            assessment.soft_skills_notes.append("Кандидат был уклончив в ответе")
-        
-        if analysis["depth_of_knowledge"] == "deep":
-            assessment.soft_skills_notes.append("Показал глубокое понимание темы")
-        
-        return assessment
-    
-    def detect_off_topic(self, answer: str, current_topic: str) -> bool:
-        """Определяет, пытается ли кандидат уйти от темы"""
-        off_topic_keywords = [
-            "не по теме", "другая тема", "погода", "отвлечемся",
-            "в другой компании", "вообще", "в принципе"
-        ]
-        
-        answer_lower = answer.lower()
-        topic_keywords = current_topic.lower().split()
-        has_topic_keywords = any(keyword in answer_lower for keyword in topic_keywords)
-        # Проверяем наличие off-topic фраз
-        has_off_topic = any(phrase in answer_lower for phrase in off_topic_keywords)
-        
-        return has_off_topic and not has_topic_keywords
\ No newline at end of file
+import asyncio
+import bisect
+from functools import lru_cache
+import hashlib
+import operator
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import json
+import logging
+import re
+from pathlib import Path
+import numpy as np
+from langchain_mistralai import ChatMistralAI
+from agents._http import astream_json_response, create_llm
+from agents._templates import PROMPTS_DIR, PromptTemplate, build_prompt_template
+from config.settings import settings
+from core.state import InterviewState, Assessment
+from core.rag import KnowledgeBase, QueryCache
+from core.llm_cache import SemanticLLMCache
+
+try:
+    import orjson  # необязательная зависимость, быстрее разбирает JSON
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число анализов в кэше точных совпадений
+EXACT_CACHE_SIZE = 512
+
+# Максимальное число анализов в семантическом кэше
+SEMANTIC_CACHE_SIZE = 256
+
+# Эвристика fallback-анализа по длине ответа в словах:
+# < 15 слов, 15-100 слов, > 100 слов -> (балл, уверенность, уклончивый ответ)
+_LENGTH_TIER_BOUNDS = (15, 101)
+_LENGTH_TIER_SCORES = ((3, 3, True), (5, 5, False), (7, 8, False))
+
+# Веса сглаживания оценки: прежнее значение и балл за новый ответ
+_EMA_OLD, _EMA_NEW = 0.7, 0.3
+# Баллы оценки, которые сглаживаются после каждого ответа
+_ASSESSMENT_SCORES = operator.attrgetter("technical_score", "communication_score", "confidence_score")
+
+# Нейтральный анализ, которым подменяется пустой или неразборчивый ответ LLM
+_FALLBACK_JSON = json.dumps({
+    "technical_score": 5,
+    "completeness_score": 5,
+    "confidence_score": 5,
+    "communication_score": 5,
+    "has_errors": False,
+    "errors_list": [],
+    "is_evasive": False,
+    "depth_of_knowledge": "adequate",
+    "recommendation_for_next_question": "Продолжить тему",
+    "suggested_correction": ""
+}, ensure_ascii=False)
+
+# Анализ при отсутствии вопроса или ответа
+_EMPTY_ANALYSIS = {
+    "technical_score": 0,
+    "completeness_score": 0,
+    "confidence_score": 0,
+    "communication_score": 5,
+    "has_errors": False,
+    "errors_list": [],
+    "is_evasive": False,
+    "depth_of_knowledge": "unknown",
+    "recommendation_for_next_question": "Продолжить тему",
+    "suggested_correction": ""
+}
+
+# Управляющие символы C0 и C1 удаляем из ответа LLM за один проход str.translate
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+# Первый JSON-объект в тексте (от первой { до последней })
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+@lru_cache(maxsize=1)
+def _default_llm() -> ChatMistralAI:
+    """Клиент LLM по умолчанию, общий для всех экземпляров ObserverAgent"""
+    return create_llm(temperature=0.2, timeout=30, max_retries=3)
+
+
+# Простой промпт на случай, если prompts/observer.txt отсутствует
+_FALLBACK_TEMPLATE = """Проанализируй ответ кандидата на технический вопрос.
+
+Верни ответ в формате JSON:
+{{
+    "technical_score": число от 0 до 10,
+    "completeness_score": число от 0 до 10,
+    "confidence_score": число от 0 до 10,
+    "communication_score": число от 0 до 10,
+    "has_errors": true/false,
+    "errors_list": ["ошибка1", "ошибка2"],
+    "is_evasive": true/false,
+    "depth_of_knowledge": "shallow/adequate/deep",
+    "recommendation_for_next_question": "текст рекомендации",
+    "suggested_correction": "правильный ответ если есть ошибки"
+}}
+{# DYNAMIC #}
+Тема: {current_topic}
+Ожидаемый уровень: {expected_level}
+Вопрос: {question}
+Ответ кандидата: {answer}
+
+Проверка знаний: {knowledge_check_result}
+"""
+
+_TEMPLATE_PATH = PROMPTS_DIR / "observer.txt"
+# Текст шаблона читается один раз при импорте модуля; None - файла нет
+_TEMPLATE_TEXT = _TEMPLATE_PATH.read_text(encoding="utf-8") if _TEMPLATE_PATH.exists() else None
+
+
+@lru_cache(maxsize=1)
+def _observer_template() -> PromptTemplate:
+    """Шаблон промпта Observer, собранный один раз за процесс"""
+    if _TEMPLATE_TEXT is None:
+        logger.warning("Файл промпта не найден: %s", _TEMPLATE_PATH)
+        return build_prompt_template(_FALLBACK_TEMPLATE)
+    
+    return build_prompt_template(_TEMPLATE_TEXT)
+
+
+class ObserverAgent:
+    def __init__(self, llm: ChatMistralAI = None, knowledge_base: KnowledgeBase = None,
+                 llm_cache: SemanticLLMCache = None):
+        self.llm = llm or _default_llm()
+        # Общий кэш ответов LLM (None - не кэшировать)
+        self.llm_cache = llm_cache
+        
+        self.knowledge_base = knowledge_base or KnowledgeBase()
+        self.prompt_template = _observer_template()
+        # Справочные блоки по темам собираются при первом обращении (обычно в подготовке,
+        # пока кандидат печатает первый ответ), чтобы создание агента не открывало Chroma
+        
+        # Семантический кэш анализов (SEMANTIC_CACHE_ENABLED): хэш (грейд, тема, вопрос, ответ) ->
+        # {"key", "vector": нормированный эмбеддинг "вопрос + ответ", "grade", "topic", "analysis"}
+        self._semantic_cache_path = Path(settings.CHROMA_PERSIST_DIR) / "observer_semcache.npz"
+        self._semantic_cache = QueryCache(SEMANTIC_CACHE_SIZE)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self._load_semantic_cache()
+        
+        # Кэш точных совпадений: хэш (грейд, вопрос, ответ) -> анализ; сохраняется в save_caches
+        self._exact_cache_path = Path(settings.LOG_DIR) / "observer_exact_cache.json"
+        self._exact_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._load_exact_cache()
+    
+    def analyze_answer(self, state: InterviewState, 
+              question: str, answer: str) -> Tuple[Dict, Assessment]:
+        """Синхронная обертка над aanalyze_answer"""
+        return asyncio.run(self.aanalyze_answer(state, question, answer))
+    
+    async def aanalyze_answer(self, state: InterviewState, 
+              question: str, answer: str,
+              request_analysis: Optional[Callable[..., Awaitable[Optional[Dict]]]] = None) -> Tuple[Dict, Assessment]:
+        """Анализирует ответ кандидата и обновляет оценку.
+        
+        request_analysis(state, question, answer, verification) заменяет запрос анализа к LLM
+        (например, совмещенный с решением координатора); кэши, проверка через базу знаний
+        и fallback остаются прежними.
+        """
+        
+        logger.debug("Observer: начинаю анализ")
+        
+        assessment = state["assessment"]
+        if not question or not answer:
+            logger.info("Пропускаю анализ: нет вопроса или ответа")
+            return self._create_empty_analysis(), assessment
+        
+        # Убедимся, что ответ не слишком длинный для API
+        answer = self._clip_answer(answer)
+        
+        grade = state["candidate_info"].grade
+        
+        # Тот же ответ на тот же вопрос - отдаем готовый анализ без эмбеддинга и LLM
+        exact_key = hashlib.blake2b(f"{grade}\x00{question}\x00{answer}".encode("utf-8")).hexdigest()
+        cached_analysis = self._exact_cache.get(exact_key)
+        if cached_analysis is not None:
+            self._exact_cache.move_to_end(exact_key)
+            logger.debug("Анализ взят из кэша. Оценка: %s/10", cached_analysis.get("technical_score", 0))
+            return dict(cached_analysis), self._update_assessment(assessment, cached_analysis, {})
+        
+        # Похожий ответ на похожий вопрос той же темы уже анализировали - LLM и RAG не нужны
+        topic = state.get("current_topic", "")
+        query_vector = self._embed_answer(question, answer) if settings.SEMANTIC_CACHE_ENABLED else None
+        cached_analysis = self._semantic_cache_lookup(query_vector, grade, topic)
+        if cached_analysis is not None:
+            logger.debug("Анализ взят из кэша. Оценка: %s/10", cached_analysis.get("technical_score", 0))
+            self._exact_cache_store(exact_key, cached_analysis)
+            return cached_analysis, self._update_assessment(assessment, cached_analysis, {})
+        
+        verification = await self._averify_answer(state, question, answer)
+        
+        # Пытаемся получить анализ от LLM
+        analysis = await (request_analysis or self._arequest_analysis)(state, question, answer, verification)
+        if analysis is None:
+            analysis = self._fallback_analysis(answer, verification)
+        else:
+            self._exact_cache_store(exact_key, analysis)
+            self._semantic_cache_store(query_vector, grade, topic, question, answer, analysis)
+        
+        # Обновляем общую оценку
+        updated_assessment = self._update_assessment(assessment, analysis, verification)
+        
+        return analysis, updated_assessment
+
+    @staticmethod
+    def _clip_answer(answer: str) -> str:
+        """Обрезает слишком длинный для API ответ"""
+        if len(answer) > 4000:
+            return answer[:4000] + "... [ответ обрезан]"
+        return answer
+    
+    @staticmethod
+    def _format_verification(verification: Dict) -> str:
+        """Результат проверки через базу знаний одной строкой для промпта"""
+        return f"Проверка: {verification['confidence']:.2f} уверенности. {verification['correct_info']}"
+    
+    def _reference_material(self, state: InterviewState) -> str:
+        """Справочный блок базы знаний для текущей темы (пустая строка, если его нет)"""
+        if not settings.RAG_ENABLED:
+            return ""
+        try:
+            return self.knowledge_base.build_cag_context(state.get("current_topic", ""))
+        except Exception:
+            return ""
+    
+    async def _averify_answer(self, state: InterviewState, question: str, answer: str) -> Dict:
+        """Проверяет ответ через RAG (если включено)"""
+        if not settings.RAG_ENABLED:
+            return {
+                "is_correct": None,
+                "confidence": 0.5,
+                "correct_info": "RAG отключен",
+                "suggested_topics": []
+            }
+        
+        current_topic = state.get("current_topic", "python")
+        
+        # Для темы есть справочный блок - он уже в промпте, поиск по базе не нужен
+        reference_material = self._reference_material(state)
+        if reference_material:
+            return {
+                "is_correct": None,
+                "confidence": 0.5,
+                "correct_info": f"Согласно справочным материалам: {reference_material[:200]}...",
+                "suggested_topics": [current_topic]
+            }
+        
+        try:
+            return await self.knowledge_base.averify_technical_answer(
+                question=question,
+                answer=answer,
+                topic=current_topic
+            )
+        except Exception as e:
+            return {
+                "is_correct": None,
+                "confidence": 0.3,
+                "correct_info": f"Ошибка при проверке: {str(e)[:100]}",
+                "suggested_topics": []
+            }
+    
+    async def _arequest_analysis(self, state: InterviewState, question: str,
+                                 answer: str, verification: Dict) -> Optional[Dict]:
+        """Запрашивает анализ одной пары у LLM; None, если ответ не удалось получить или разобрать"""
+        try:
+            logger.debug("Анализ через LLM...")
+            
+            # Форматируем промпт
+            formatted_prompt = self.prompt_template.format_messages(
+                current_topic=state.get("current_topic", "Неизвестно"),
+                expected_level=state["candidate_info"].grade,
+                question=question,
+                answer=answer,
+                knowledge_check_result=self._format_verification(verification),
+                reference_material=self._reference_material(state) or "Нет справочных материалов по теме"
+            )
+            
+            # Читаем ответ потоком до конца JSON-объекта
+            raw_content = self.llm_cache.get(self.llm, formatted_prompt, semantic=False) if self.llm_cache else None
+            if raw_content is None:
+                raw_content = await astream_json_response(self.llm, formatted_prompt)
+            
+            # Очищаем и парсим JSON ответ
+            content = self._clean_json_response(raw_content)
+            analysis = _loads(content)
+            if self.llm_cache:
+                self.llm_cache.set(self.llm, formatted_prompt, raw_content, semantic=False)
+            logger.debug("Анализ получен. Оценка: %s/10", analysis.get("technical_score", 0))
+            return analysis
+            
+        except ValueError as e:  # json.JSONDecodeError и orjson.JSONDecodeError
+            logger.warning("Ошибка парсинга JSON: %s", e)
+            logger.debug("Сырой ответ: %.200s...", raw_content if 'raw_content' in locals() else "Нет ответа")
+            
+        except Exception as e:
+            logger.warning("Ошибка запроса к LLM: %s", e)
+        
+        return None
+        
+    def _exact_cache_store(self, key: str, analysis: Dict) -> None:
+        """Кладет анализ в кэш точных совпадений, вытесняя самые давние записи"""
+        self._exact_cache[key] = dict(analysis)
+        self._exact_cache.move_to_end(key)
+        if len(self._exact_cache) > EXACT_CACHE_SIZE:
+            self._exact_cache.popitem(last=False)
+    
+    def _load_exact_cache(self) -> None:
+        """Загружает кэш точных совпадений, сохраненный при прошлом запуске"""
+        if not self._exact_cache_path.exists():
+            return
+        
+        try:
+            entries = json.loads(self._exact_cache_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Не удалось загрузить кэш анализов: %s", e)
+            return
+        
+        for key, analysis in list(entries.items())[-EXACT_CACHE_SIZE:]:
+            self._exact_cache[key] = analysis
+    
+    def save_caches(self) -> None:
+        """Сохраняет кэши анализов на диск; вызывается workflow по завершении интервью"""
+        self._save_exact_cache()
+        if settings.SEMANTIC_CACHE_ENABLED:
+            self._save_semantic_cache()
+    
+    def _save_exact_cache(self) -> None:
+        """Сохраняет кэш точных совпадений в LOG_DIR"""
+        if not self._exact_cache:
+            return
+        
+        try:
+            self._exact_cache_path.write_text(
+                json.dumps(self._exact_cache, ensure_ascii=False), encoding="utf-8"
+            )
+        except Exception as e:
+            logger.warning("Не удалось сохранить кэш анализов: %s", e)
+    
+    def _embed_answer(self, question: str, answer: str) -> Optional[np.ndarray]:
+        """Нормированный эмбеддинг пары вопрос-ответ; None, если модель недоступна"""
+        try:
+            return self.knowledge_base.embed_texts([f"{question}\n{answer}"])[0]
+        except Exception as e:
+            logger.warning("Ошибка построения эмбеддинга ответа: %s", e)
+            return None
+    
+    def _load_semantic_cache(self) -> None:
+        """Загружает семантический кэш с диска, если он есть"""
+        if not self._semantic_cache_path.exists():
+            return
+        
+        try:
+            with np.load(self._semantic_cache_path) as data:
+                vectors = data["vectors"]
+                entries = [json.loads(entry) for entry in data["entries"]]
+        except Exception as e:
+            logger.warning("Не удалось загрузить кэш анализов: %s", e)
+            return
+        
+        if len(vectors) != len(entries):
+            return
+        # Записи старого формата (без темы) пропускаются: их нельзя сопоставить с темой вопроса
+        for vector, entry in list(zip(vectors, entries))[-SEMANTIC_CACHE_SIZE:]:
+            if {"key", "grade", "topic", "analysis"} <= entry.keys():
+                self._semantic_cache.put(entry["key"], {**entry, "vector": vector})
+    
+    def _save_semantic_cache(self) -> None:
+        """Сохраняет семантический кэш в CHROMA_PERSIST_DIR одним файлом"""
+        entries = self._semantic_cache.values()
+        if not entries:
+            return
+        
+        try:
+            np.savez(
+                self._semantic_cache_path,
+                vectors=np.stack([entry["vector"] for entry in entries]),
+                entries=np.array([
+                    json.dumps({name: value for name, value in entry.items() if name != "vector"}, ensure_ascii=False)
+                    for entry in entries
+                ])
+            )
+        except Exception as e:
+            logger.warning("Не удалось сохранить кэш анализов: %s", e)
+    
+    def _semantic_cache_lookup(self, vector: Optional[np.ndarray], grade: str, topic: str) -> Optional[Dict]:
+        """Ищет анализ самой близкой пары вопрос-ответ того же грейда и той же темы"""
+        if vector is None:
+            return None
+        
+        candidates = [
+            entry for entry in self._semantic_cache.values()
+            if entry["grade"] == grade and entry["topic"] == topic and len(entry["vector"]) == len(vector)
+        ]
+        if not candidates:
+            return None
+        
+        # Эмбеддинги нормированы: скалярное произведение = косинусная близость
+        scores = np.stack([entry["vector"] for entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < settings.SEMANTIC_CACHE_THRESHOLD:
+            return None
+        
+        # Обращение по ключу поднимает запись в LRU-порядке
+        entry = self._semantic_cache.get(candidates[best]["key"])
+        return dict(entry["analysis"]) if entry is not None else None
+    
+    def _semantic_cache_store(self, vector: Optional[np.ndarray], grade: str, topic: str,
+                              question: str, answer: str, analysis: Dict) -> None:
+        """Добавляет анализ от LLM в семантический кэш, вытесняя давно использованные записи"""
+        if vector is None:
+            return
+        
+        key = hashlib.blake2b(f"{grade}\x00{topic}\x00{question}\x00{answer}".encode("utf-8")).hexdigest()
+        self._semantic_cache.put(key, {
+            "key": key,
+            "vector": np.asarray(vector, dtype=np.float32),
+            "grade": grade,
+            "topic": topic,
+            "analysis": analysis
+        })
+    
+    def _clean_json_response(self, text: str) -> str:
+        """Очищает JSON ответ от управляющих символов и извлекает JSON"""
+        if not text:
+            return _FALLBACK_JSON
+        
+        # Обычно модель возвращает чистый JSON - тогда чистить нечего
+        try:
+            _loads(text)
+            return text
+        except ValueError:
+            pass
+        
+        text = text.translate(_CONTROL_CHARS)
+        
+        # Тело блока ```json ... ``` (или просто ``` ... ```); без закрывающего ``` - до конца текста
+        start = text.find("```json")
+        if start >= 0:
+            start += len("```json")
+        else:
+            start = text.find("```")
+            if start >= 0:
+                start += len("```")
+        if start >= 0:
+            end = text.find("```", start)
+            text = text[start:end if end >= 0 else len(text)].strip()
+        
+        # Убедимся, что это валидный JSON
+        try:
+            _loads(text)
+            return text
+        except ValueError:
+            matches = _JSON_OBJECT_RE.search(text)
+            if matches:
+                return matches.group(0)
+            
+            # Fallback - нейтральный анализ
+            return _FALLBACK_JSON
+    
+    def _create_empty_analysis(self) -> Dict:
+        """Создает пустой анализ при отсутствии данных"""
+        # Свой список ошибок у каждой копии, чтобы правка одного анализа не задела шаблон
+        return {**_EMPTY_ANALYSIS, "errors_list": []}
+    
+    def _fallback_analysis(self, answer: str, verification: Dict) -> Dict:
+        """Fallback анализ если LLM не сработал"""
+        answer_length = len(answer.split())
+        
+        # Короткие/пустые ответы ("не знаю", "нет", "no"...): не больше двух слов
+        if answer_length <= 2:
+            return {
+                "technical_score": 1,
+                "completeness_score": 1,
+                "confidence_score": 2,
+                "communication_score": 3,
+                "has_errors": True,
+                "errors_list": ["Слишком краткий ответ", "Не показано понимание темы"],
+                "is_evasive": True,
+                "depth_of_knowledge": "shallow",
+                "recommendation_for_next_question": "Задать более простой вопрос по той же теме или уточняющий вопрос",
+                "suggested_correction": "Списки изменяемы (mutable), кортежи неизменяемы (immutable). Списки используют [], кортежи используют (). Пример использования списка: для хранения элементов, которые могут изменяться. Пример использования кортежа: для координат (x, y) или константных данных."
+            }
+        
+        # Обычная эвристика для более длинных ответов
+        score, confidence, is_evasive = _LENGTH_TIER_SCORES[
+            bisect.bisect_right(_LENGTH_TIER_BOUNDS, answer_length)
+        ]
+        
+        return {
+            "technical_score": score,
+            "completeness_score": score,
+            "confidence_score": confidence,
+            "communication_score": 5,
+            "has_errors": verification.get("confidence", 0.5) < 0.4,
+            "errors_list": ["Неполный ответ"] if answer_length < 25 else [],
+            "is_evasive": is_evasive,
+            "depth_of_knowledge": "adequate" if score > 6 else "shallow",
+            "recommendation_for_next_question": "Продолжить тему" if score > 5 else "Упростить вопрос",
+            "suggested_correction": verification.get("correct_info", "")
+        }
+    
+    def _update_assessment(self, assessment: Assessment, 
+                          analysis: Dict, verification: Dict) -> Assessment:
+        """Обновляет общую оценку на основе анализа ответа"""
+        
+        # Экспоненциальное сглаживание технического балла, коммуникации и уверенности
+        technical, communication, confidence = _ASSESSMENT_SCORES(assessment)
+        assessment.technical_score = technical * _EMA_OLD + analysis["technical_score"] * _EMA_NEW
+        assessment.communication_score = communication * _EMA_OLD + analysis["communication_score"] * _EMA_NEW
+        assessment.confidence_score = confidence * _EMA_OLD + analysis["confidence_score"] * _EMA_NEW
+        
+        # Добавляем пробелы в знаниях если есть ошибки
+        if analysis["has_errors"] and analysis.get("suggested_correction"):
+            topic = "текущая тема"
+            assessment.knowledge_gaps[topic] = analysis["suggested_correction"][:200]
+        
+        # Добавляем заметки по софт скиллам
+        if analysis["is_evasive"]:
+            assessment.soft_skills_notes.append("Кандидат был уклончив в ответе")
+        
+        if analysis["depth_of_knowledge"] == "deep":
+            assessment.soft_skills_notes.append("Показал глубокое понимание темы")
+        
+        return assessment
\ No newline at end of file
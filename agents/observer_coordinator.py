@@ -0,0 +1,106 @@
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import logging
+from pydantic import BaseModel, Field, ValidationError
+from agents._http import astream_json_response
+from agents._templates import load_prompt_template
+from agents.coordinator import CoordinatorAgent, CoordinatorDecision
+from agents.observer import ObserverAgent
+from core.state import InterviewState, Assessment
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyzeAndDecide(BaseModel):
+    """Совмещенный ответ LLM: анализ ответа кандидата и решение координатора"""
+    analysis: Dict[str, Any]
+    decision: CoordinatorDecision = Field(default_factory=CoordinatorDecision)
+
+
+class ObserverCoordinatorAgent:
+    """Анализ ответа и решение о следующем шаге одним запросом к LLM.
+
+    Проверка через базу знаний, кэши анализов, fallback и обновление оценки - от ObserverAgent,
+    данные промпта и правила завершения интервью - от CoordinatorAgent. Если анализ взят
+    из кэша или совмещенный ответ не разобрался, решение принимает координатор отдельным вызовом.
+    """
+
+    def __init__(self, observer: ObserverAgent, coordinator: CoordinatorAgent):
+        self.observer = observer
+        self.coordinator = coordinator
+        self.prompt_template = load_prompt_template("analyze_and_decide.txt")
+
+    def analyze_and_decide(self, state: InterviewState, question: str,
+                           answer: str) -> Tuple[Dict, Assessment, Optional[Dict[str, Any]]]:
+        """Синхронная обертка над aanalyze_and_decide"""
+        return asyncio.run(self.aanalyze_and_decide(state, question, answer))
+
+    async def aanalyze_and_decide(self, state: InterviewState, question: str,
+                                  answer: str) -> Tuple[Dict, Assessment, Optional[Dict[str, Any]]]:
+        """Анализирует ответ и решает, как продолжить интервью.
+
+        Возвращает (анализ, обновленная оценка, решение координатора); решение None,
+        если интервью уже решено завершить и спрашивать координатора не нужно.
+        """
+        # Лимит вопросов или запрос кандидата - решение не нужно, только анализ
+        if self.coordinator.should_end_interview(state):
+            analysis, assessment = await self.observer.aanalyze_answer(state, question, answer)
+            return analysis, assessment, None
+
+        decisions = []
+
+        async def request_analysis(state: InterviewState, question: str,
+                                   answer: str, verification: Dict) -> Optional[Dict]:
+            result = await self._arequest_analysis_and_decision(state, question, answer, verification)
+            if result is None:
+                return None
+            decisions.append(result.decision.model_dump())
+            return result.analysis
+
+        analysis, assessment = await self.observer.aanalyze_answer(
+            state, question, answer, request_analysis=request_analysis
+        )
+
+        # Координатор видит уже обновленную оценку
+        decision_state = {**state, "assessment": assessment}
+        if self.coordinator.should_end_interview(decision_state):
+            return analysis, assessment, None
+
+        if decisions:
+            return analysis, assessment, decisions[0]
+
+        # Анализ из кэша или fallback - решение отдельным запросом
+        decision_state["observer_recommendation"] = analysis.get("recommendation_for_next_question", "")
+        return analysis, assessment, await self.coordinator.adecide_next_step(decision_state)
+
+    async def _arequest_analysis_and_decision(self, state: InterviewState, question: str,
+                                              answer: str, verification: Dict) -> Optional[AnalyzeAndDecide]:
+        """Один запрос к LLM за анализом и решением; None, если ответ не удалось получить или разобрать"""
+        observer = self.observer
+        try:
+            formatted_prompt = self.prompt_template.format_messages(
+                **self.coordinator.build_prompt_data(state),
+                reference_material=observer._reference_material(state) or "Нет справочных материалов по теме",
+                question=question,
+                answer=answer,
+                knowledge_check_result=observer._format_verification(verification)
+            )
+
+            raw_content = observer.llm_cache.get(observer.llm, formatted_prompt, semantic=False) if observer.llm_cache else None
+            if raw_content is None:
+                raw_content = await astream_json_response(observer.llm, formatted_prompt)
+
+            result = AnalyzeAndDecide.model_validate_json(observer._clean_json_response(raw_content))
+            if observer.llm_cache:
+                observer.llm_cache.set(observer.llm, formatted_prompt, raw_content, semantic=False)
+            logger.debug("Анализ и решение получены. Оценка: %s/10, действие: %s",
+                         result.analysis.get("technical_score", 0), result.decision.action)
+            return result
+
+        except ValidationError as e:
+            logger.warning("Ошибка разбора совмещенного ответа: %s", e)
+
+        except Exception as e:
+            logger.warning("Ошибка запроса к LLM: %s", e)
+
+        return None
@@ -1,14 +1,14 @@
-from .state import InterviewState, CandidateInfo, Assessment, Message
-from .logger import InterviewLogger
-from .rag import KnowledgeBase
-from .graph import InterviewWorkflow
-
-__all__ = [
-    'InterviewState',
-    'CandidateInfo',
-    'Assessment',
-    'Message',
-    'InterviewLogger',
-    'KnowledgeBase',
-    'InterviewWorkflow'
+from .state import InterviewState, CandidateInfo, Assessment, Message
+from .logger import InterviewLogger
+from .rag import KnowledgeBase
+from .graph import InterviewWorkflow
+
+__all__ = [
+    'InterviewState',
+    'CandidateInfo',
+    'Assessment',
+    'Message',
+    'InterviewLogger',
+    'KnowledgeBase',
+    'InterviewWorkflow'
 ]
\ No newline at end of file
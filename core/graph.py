@@ -1,430 +1,528 @@
-from typing import TypedDict, Annotated, List, Dict, Optional
-import operator
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-import json
-
-from agents.coordinator import CoordinatorAgent
-from agents.interviewer import InterviewerAgent
-from agents.observer import ObserverAgent
-from agents.feedback_generator import FeedbackGenerator
-from core.state import InterviewState, Message, Assessment, CandidateInfo
-from core.logger import InterviewLogger
-from core.rag import KnowledgeBase
-from config import settings
-from core.display import DisplayManager
-
-class InterviewWorkflow:
-    def __init__(self):
-        self.knowledge_base = KnowledgeBase()
-        
-        self.coordinator = CoordinatorAgent()
-        self.interviewer = InterviewerAgent()
-        self.observer = ObserverAgent(knowledge_base=self.knowledge_base)
-        self.feedback_gen = FeedbackGenerator(knowledge_base=self.knowledge_base)
-        
-        self.workflow = StateGraph(InterviewState)
-        
-        self.workflow.add_node("start_interview", self.start_interview)
-        self.workflow.add_node("coordinator_decision", self.coordinator_decision)
-        self.workflow.add_node("generate_question", self.generate_question)
-        self.workflow.add_node("get_user_answer", self.get_user_answer)
-        self.workflow.add_node("analyze_answer", self.analyze_answer)
-        self.workflow.add_node("generate_feedback", self.generate_feedback)
-        self.workflow.add_node("end_interview", self.end_interview)
-        
-        self.workflow.set_entry_point("start_interview")
-        
-        self.workflow.add_edge("start_interview", "coordinator_decision")
-        self.workflow.add_conditional_edges(
-            "coordinator_decision",
-            self.check_should_continue,
-            {
-                "continue": "generate_question",
-                "end": "generate_feedback"
-            }
-        )
-        self.workflow.add_edge("generate_question", "get_user_answer")
-        self.workflow.add_edge("get_user_answer", "analyze_answer")
-        self.workflow.add_edge("analyze_answer", "coordinator_decision")
-        self.workflow.add_edge("generate_feedback", "end_interview")
-        self.workflow.add_edge("end_interview", END)
-        
-        self.memory = MemorySaver()
-        self.app = self.workflow.compile(checkpointer=self.memory)
-
-        self.display = DisplayManager()
-    
-    def start_interview(self, state: InterviewState) -> InterviewState:
-        """Инициализация интервью"""
-        self.display.print_section("НАЧАЛО ИНТЕРВЬЮ")
-        
-        if "log_data" not in state:
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-            print(f"Лог инициализирован в start_interview")
-        else:
-            print(f"Лог уже существует в start_interview, записей: {len(state['log_data'].get('turns', []))}")
-        
-        if "current_topic" not in state:
-            state["current_topic"] = ""
-        
-        if "difficulty_level" not in state:
-            state["difficulty_level"] = settings.DEFAULT_DIFFICULTY
-        
-        if "questions_asked" not in state:
-            state["questions_asked"] = []
-        
-        if "internal_monologue" not in state:
-            state["internal_monologue"] = []
-        
-        if "assessment" not in state:
-            state["assessment"] = Assessment()
-        
-        if "messages" not in state:
-            state["messages"] = []
-        
-        if "observer_recommendation" not in state:
-            state["observer_recommendation"] = None
-        
-        if "current_turn_thoughts" not in state:
-            state["current_turn_thoughts"] = []
-        
-        state["interview_complete"] = False
-        state["need_feedback"] = False
-        state["current_question"] = None
-        state["current_answer"] = None
-        state["coordinator_instruction"] = None
-        
-        self.display.print_agent_action("System", f"Интервью начато для {state['candidate_info'].name}")
-        
-        return state
-    
-    def coordinator_decision(self, state: InterviewState) -> InterviewState:
-        """Координатор принимает решение о следующем шаге"""
-        if "log_data" not in state:
-            print("ОШИБКА: log_data отсутствует в coordinator_decision!")
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-        else:
-            print(f"log_data передан в coordinator_decision, записей: {len(state['log_data'].get('turns', []))}")
-        
-        if self.coordinator.should_end_interview(state):
-            state["interview_complete"] = True
-            self.display.print_agent_action("Coordinator", "Завершаем интервью")
-            return state
-        
-        decision = self.coordinator.decide_next_step(state)
-    
-        state["coordinator_instruction"] = decision.get("instruction_to_interviewer", "")
-        
-        if decision.get("action") == "change_topic" and decision.get("new_topic"):
-            old_topic = state.get("current_topic", "нет темы")
-            state["current_topic"] = decision["new_topic"]
-            self.display.print_agent_action("Coordinator", f"Меняем тему на '{decision['new_topic']}'")
-        
-        if "current_turn_thoughts" not in state:
-            state["current_turn_thoughts"] = []
-        else:
-            state["current_turn_thoughts"] = []
-        
-        coordinator_thought = f"Решение: {decision.get('action', 'continue')}"
-        if decision.get("reasoning"):
-            coordinator_thought += f", обоснование: {decision.get('reasoning')[:100]}..."
-        
-        state["current_turn_thoughts"].append(f"[Coordinator]: {coordinator_thought}")
-        
-        # Если решение - завершить интервью
-        if decision.get("action") == "end_interview":
-            state["interview_complete"] = True
-            self.display.print_agent_action("Coordinator", "Завершаем интервью по решению LLM")
-        
-        return state
-    
-    def generate_question(self, state: InterviewState) -> InterviewState:
-        """Генерация вопроса интервьюером"""
-        if "log_data" not in state:
-            print("ОШИБКА: log_data отсутствует в generate_question!")
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-        
-        self.display.print_agent_action("Interviewer", "Генерация вопроса...")
-        question = self.interviewer.generate_question(state)
-        
-        if "current_turn_thoughts" not in state:
-            state["current_turn_thoughts"] = []
-        
-        interviewer_thought = f"Сгенерирован вопрос по теме '{state.get('current_topic', 'общая')}'"
-        if state.get("coordinator_instruction"):
-            interviewer_thought += f", инструкция: {state.get('coordinator_instruction')[:100]}..."
-        
-        state["current_turn_thoughts"].append(f"[Interviewer]: {interviewer_thought}")
-        
-        messages = state.get("messages", [])
-        messages = messages + [Message(
-            role="interviewer",
-            content=question
-        )]
-        
-        state["messages"] = messages
-        state["current_question"] = question
-        state["last_question"] = question
-        state["questions_asked"] = state.get("questions_asked", []) + [question]
-        state["current_answer"] = ""
-        
-        return state
-    
-    def get_user_answer(self, state: InterviewState) -> InterviewState:
-        """Получение ответа от пользователя"""
-        if "log_data" not in state:
-            print("ОШИБКА: log_data отсутствует в get_user_answer!")
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-        
-        current_question = state.get("current_question", "")
-        
-        if not current_question:
-            messages = state.get("messages", [])
-            for msg in reversed(messages):
-                if msg.role == "interviewer":
-                    current_question = msg.content
-                    break
-        
-        if current_question:
-            self.display.print_question(current_question)
-        else:
-            print("\n Вопрос не найден в состоянии")
-        
-        try:
-            user_input = input("Ваш ответ: ").strip()
-        except EOFError:
-            user_input = "стоп"
-        
-        if user_input.lower() in ["стоп", "stop", "завершить", "конец", "exit", "quit"]:
-            self.display.print_agent_action("System", "Интервью завершено по запросу пользователя")
-            state["interview_complete"] = True
-            state["current_answer"] = user_input
-            return state
-        
-        self.display.print_answer(user_input)
-        
-        messages = state.get("messages", [])
-        messages = messages + [Message(
-            role="user",
-            content=user_input
-        )]
-        
-        if "current_turn_thoughts" not in state:
-            state["current_turn_thoughts"] = []
-        
-        state["current_turn_thoughts"].append(f"[System]: Получен ответ длиной {len(user_input)} символов")
-        
-        state["messages"] = messages
-        state["current_answer"] = user_input
-        state["last_answer"] = user_input
-        
-        return state
-    
-    def analyze_answer(self, state: InterviewState) -> InterviewState:
-        """Анализ ответа наблюдателем"""
-        if "log_data" not in state:
-            print("ОШИБКА: log_data отсутствует в analyze_answer!")
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-        
-        question = state.get("current_question", "")
-        answer = state.get("current_answer", "")
-        
-        if not question or not answer:
-            print(" Observer: Нет вопроса или ответа для анализа")
-            print(f"  Вопрос: {question}")
-            print(f"  Ответ: {answer}")
-            return state
-        
-        try:
-            analysis, updated_assessment = self.observer.analyze_answer(state, question, answer)
-            
-            internal_thoughts = ""
-            
-            if "current_turn_thoughts" in state:
-                for thought in state["current_turn_thoughts"]:
-                    internal_thoughts += f"{thought}\n"
-            
-            if analysis.get("reasoning"):
-                internal_thoughts += f"[Observer]: {analysis.get('reasoning')}\n"
-            
-            if analysis.get("technical_score") is not None:
-                internal_thoughts += f"[Observer]: Техническая оценка: {analysis.get('technical_score')}/10\n"
-            
-            if analysis.get("communication_score") is not None:
-                internal_thoughts += f"[Observer]: Коммуникационная оценка: {analysis.get('communication_score')}/10\n"
-            
-            if analysis.get("recommendation_for_next_question"):
-                internal_thoughts += f"[Observer]: Рекомендация: {analysis.get('recommendation_for_next_question')}\n"
-            
-            print(f"Добавление записи в лог: вопрос длиной {len(question)}, ответ длиной {len(answer)}")
-            
-            state["log_data"] = InterviewLogger.add_turn(
-                state["log_data"],
-                question,
-                answer,
-                internal_thoughts.strip()
-            )
-            
-            print(f"Запись добавлена. Всего записей: {len(state['log_data']['turns'])}")
-            
-            state["assessment"] = updated_assessment
-            state["observer_recommendation"] = analysis.get("recommendation_for_next_question", "")
-            
-            state["current_turn_thoughts"] = []
-            state["coordinator_instruction"] = None
-            
-        except Exception as e:
-            print(f"Observer: Ошибка анализа: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        return state
-    
-    def generate_feedback(self, state: InterviewState) -> InterviewState:
-        """Генерация финального фидбэка"""
-        print("\n" + "="*60)
-        print("ГЕНЕРАЦИЯ ФИНАЛЬНОГО ФИДБЭКА")
-        print("="*60)
-        
-        if "log_data" not in state:
-            print("Нет log_data, создаем новый...")
-            state["log_data"] = InterviewLogger.init_log_data(state["candidate_info"])
-        
-        from datetime import datetime
-        if "start_time" in state["log_data"]:
-            start_time = datetime.fromisoformat(state["log_data"]["start_time"])
-            duration_minutes = (datetime.now() - start_time).total_seconds() / 60
-        else:
-            duration_minutes = 10.0
-        
-        print(f"Длительность интервью: {duration_minutes:.1f} минут")
-        
-        feedback = self.feedback_gen.generate_feedback(state, duration_minutes)
-        
-        print("Сохраняем фидбэк в лог...")
-        state["log_data"] = InterviewLogger.save_final_feedback(state["log_data"], feedback)
-        
-        print("\n" + "="*60)
-        print("ИТОГОВЫЙ ФИДБЭК")
-        print("="*60)
-        
-        if isinstance(feedback, dict) and "full_text_feedback" in feedback:
-            print(feedback["full_text_feedback"])
-        elif isinstance(feedback, str):
-            print(feedback)
-        else:
-            print("Фидбэк не в текстовом формате")
-        
-        try:
-            scenario_num = state.get("scenario_number", 1)
-            filename = f"interview_log_{scenario_num}.json"
-            
-            log_file = InterviewLogger.save_to_file(
-                state["log_data"],
-                state["candidate_info"].name,
-                filename
-            )
-            print(f"\nЛог сохранен в: {log_file}")
-            
-            with open(log_file, 'r', encoding='utf-8') as f:
-                saved_data = json.load(f)
-                print(f"Проверка сохраненного файла:")
-                print(f"   Участник: {saved_data.get('participant_name')}")
-                print(f"   Записей (turns): {len(saved_data.get('turns', []))}")
-                print(f"   Фидбэк: {'Да' if saved_data.get('final_feedback') else 'Нет'}")
-                
-        except Exception as e:
-            print(f" Ошибка сохранения лога: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        state["final_feedback"] = feedback
-        return state
-    
-    def end_interview(self, state: InterviewState) -> InterviewState:
-        """Завершение интервью"""
-        print("\n" + "="*60)
-        print("ИНТЕРВЬЮ ЗАВЕРШЕНО")
-        print("="*60)
-        
-        turns = len(state["log_data"]["turns"]) if "log_data" in state else 0
-        
-        print(f"\n Статистика:")
-        print(f"   Вопросов задано: {turns}")
-        
-        return state
-    
-    def check_should_continue(self, state: InterviewState) -> str:
-        """Проверяет, нужно ли продолжать интервью"""
-        if state.get("interview_complete", False):
-            return "end"
-        
-        max_questions = settings.MAX_TURNS
-        questions_asked = len(state.get("questions_asked", []))
-        
-        if questions_asked >= max_questions:
-            print(f"Достигнуто максимальное количество вопросов ({max_questions})")
-            return "end"
-        
-        return "continue"
-    
-    def run(self, candidate_info: CandidateInfo, scenario_number: int = 1, config: Dict = None):
-        """Запуск интервью"""
-        # Инициализируем состояние с log_data сразу
-        initial_state: InterviewState = {
-            "candidate_info": candidate_info,
-            "messages": [],
-            "internal_monologue": [],
-            "current_topic": "",
-            "difficulty_level": settings.DEFAULT_DIFFICULTY,
-            "assessment": Assessment(),
-            "questions_asked": [],
-            "observer_recommendation": None,
-            "need_feedback": False,
-            "interview_complete": False,
-            "current_agent": "coordinator",
-            "current_question": None,
-            "current_answer": None,
-            "coordinator_instruction": None,
-            "log_data": InterviewLogger.init_log_data(candidate_info),
-            "current_turn_thoughts": [],
-            "scenario_number": scenario_number
-        }
-        
-        print(f"\n Запуск мультиагентной системы интервью... (Сценарий {scenario_number})")
-        print(f"Лог инициализирован, записей: {len(initial_state['log_data'].get('turns', []))}")
-        
-        try:
-            thread_id = f"interview_{candidate_info.name}_{candidate_info.position}_{scenario_number}"
-            
-            final_state = self.app.invoke(
-                initial_state,
-                config={"configurable": {"thread_id": thread_id}}
-            )
-            
-            print(f"\n Интервью успешно завершено! (Сценарий {scenario_number})")
-            
-            if "log_data" in final_state:
-                print(f"Финальный лог содержит {len(final_state['log_data'].get('turns', []))} записей")
-            else:
-                print("Финальный лог не найден в состоянии!")
-            
-        except KeyboardInterrupt:
-            print(f"\n\n  Интервью прервано пользователем (Сценарий {scenario_number})")
-            if "log_data" in initial_state and initial_state["log_data"]:
-                try:
-                    filename = f"interview_interrupted_{scenario_number}.json"
-                    InterviewLogger.save_to_file(
-                        initial_state["log_data"],
-                        candidate_info.name,
-                        filename
-                    )
-                    print(f" Лог прерванного интервью сохранен в {filename}")
-                except Exception as e:
-                    print(f" Ошибка сохранения лога при прерывании: {e}")
-        
-        except Exception as e:
-            print(f"\n Ошибка: {e}")
-            import traceback
-            traceback.print_exc()
\ No newline at end of file
+from typing import TypedDict, Annotated, List, Dict, Optional
+import asyncio
+import logging
+import operator
+import sys
+import threading
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint import CheckpointAt
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.coordinator import CoordinatorAgent
+from agents.interviewer import InterviewerAgent
+from agents.observer import ObserverAgent
+from agents.feedback_generator import FeedbackGenerator
+from agents.observer_coordinator import ObserverCoordinatorAgent
+from core.state import InterviewState, Message, Assessment, CandidateInfo, StateManager, validate_state
+from core.logger import InterviewLogger
+from core.rag import KnowledgeBase
+from core.llm_cache import SemanticLLMCache
+from config import settings
+from core.display import DisplayManager
+
+logger = logging.getLogger(__name__)
+
+# Поля с редьюсером operator.add: шаг хода возвращает только новые элементы
+_APPEND_KEYS = ("messages", "questions_asked")
+
+
+def _apply_step(view: Dict, updates: Dict, step: Dict) -> None:
+    """Применяет обновления шага хода к локальной копии состояния и к итоговым обновлениям узла"""
+    for key, value in step.items():
+        if key in _APPEND_KEYS:
+            view[key] = view.get(key, []) + value
+            updates[key] = updates.get(key, []) + value
+        else:
+            view[key] = updates[key] = value
+
+
+async def _ainput(prompt: str) -> str:
+    """input() в отдельном daemon-потоке, не блокируя цикл событий.
+    
+    Не через run_in_executor: при Ctrl-C asyncio.run дожидается потоков пула,
+    и программа висела бы в input(), пока пользователь не нажмет Enter.
+    """
+    loop = asyncio.get_running_loop()
+    if not sys.stdin.isatty():
+        # Из pipe или файла строка (или EOF) приходит сразу. Daemon-поток здесь не годится:
+        # он держал бы блокировку буфера sys.stdin, и интерпретатор упал бы при завершении
+        return await loop.run_in_executor(None, input, prompt)
+    
+    future = loop.create_future()
+    
+    def resolve(result: Optional[str], error: Optional[BaseException]) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def read() -> None:
+        try:
+            result, error = input(prompt), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # Цикл событий уже закрыт - ответ никому не нужен
+            pass
+    
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+
+class InterviewWorkflow:
+    def __init__(self, checkpoint_at: CheckpointAt = CheckpointAt.END_OF_RUN):
+        self.knowledge_base = KnowledgeBase()
+        # Общий для всех агентов кэш ответов LLM (похожие промпты сравниваются по эмбеддингам)
+        self.llm_cache = (
+            SemanticLLMCache(embed_texts=self.knowledge_base.embed_texts)
+            if settings.CACHE_ENABLED else None
+        )
+        
+        self.coordinator = CoordinatorAgent(llm_cache=self.llm_cache)
+        self.interviewer = InterviewerAgent(llm_cache=self.llm_cache)
+        self.observer = ObserverAgent(knowledge_base=self.knowledge_base, llm_cache=self.llm_cache)
+        self.feedback_gen = FeedbackGenerator(knowledge_base=self.knowledge_base, llm_cache=self.llm_cache)
+        # После каждого ответа анализ и решение о следующем шаге - одним запросом к LLM
+        self.observer_coordinator = ObserverCoordinatorAgent(self.observer, self.coordinator)
+        
+        self.workflow = StateGraph(InterviewState)
+        
+        # Шаги хода всегда идут подряд, поэтому весь ход - один узел:
+        # меньше шагов графа, вызовов редьюсеров и проверок условных ребер
+        self.workflow.add_node("start_interview", self.start_interview)
+        self.workflow.add_node("turn", self.turn)
+        self.workflow.add_node("generate_feedback", self.generate_feedback)
+        
+        self.workflow.set_entry_point("start_interview")
+        
+        self.workflow.add_edge("start_interview", "turn")
+        self.workflow.add_conditional_edges(
+            "turn",
+            self.check_should_continue,
+            {
+                "continue": "turn",
+                "end": "generate_feedback"
+            }
+        )
+        self.workflow.add_edge("generate_feedback", END)
+        
+        # Интервью не возобновляется с середины, поэтому по умолчанию состояние сохраняется
+        # один раз в конце прогона, а не после каждого узла (END_OF_STEP)
+        self.memory = MemorySaver(at=checkpoint_at)
+        self.app = self.workflow.compile(checkpointer=self.memory)
+
+        self.display = DisplayManager()
+    
+    def start_interview(self, state: InterviewState) -> Dict:
+        """Инициализация интервью"""
+        self.display.print_section("НАЧАЛО ИНТЕРВЬЮ")
+        
+        # Узлы возвращают только измененные поля: messages и questions_asked
+        # дополняются редьюсером operator.add, а не перезаписываются
+        updates = {}
+        
+        if "current_topic" not in state:
+            updates["current_topic"] = ""
+        
+        if "difficulty_level" not in state:
+            updates["difficulty_level"] = settings.DEFAULT_DIFFICULTY
+        
+        if "questions_asked_set" not in state:
+            updates["questions_asked_set"] = set(state.get("questions_asked", []))
+        
+        if "internal_monologue" not in state:
+            updates["internal_monologue"] = []
+        
+        if "assessment" not in state:
+            updates["assessment"] = Assessment()
+        
+        if "observer_recommendation" not in state:
+            updates["observer_recommendation"] = None
+        
+        if "current_turn_thoughts" not in state:
+            updates["current_turn_thoughts"] = []
+        
+        updates["interview_complete"] = False
+        updates["need_feedback"] = False
+        updates["current_question"] = None
+        updates["current_answer"] = None
+        updates["coordinator_instruction"] = None
+        
+        # Состояние, переданное снаружи, могло прийти без обязательных полей - предупреждаем сразу
+        validate_state({**state, **updates})
+        
+        self.display.print_agent_action("System", f"Интервью начато для {state['candidate_info'].name}")
+        
+        return updates
+    
+    async def turn(self, state: InterviewState) -> Dict:
+        """Один ход интервью: вопрос, ответ кандидата, анализ ответа и решение о следующем шаге.
+        
+        На первом ходу координатор сначала выбирает, с чего начать. Каждый шаг видит
+        обновления предыдущих, а узел возвращает их все вместе.
+        """
+        view = dict(state)
+        updates = {}
+        
+        if not state.get("questions_asked"):
+            _apply_step(view, updates, await self.coordinator_decision(view))
+            if view.get("interview_complete"):
+                return updates
+        
+        _apply_step(view, updates, await self.generate_question(view))
+        
+        # Пока кандидат печатает ответ, собираем справочные блоки тем для анализа. Это нужно
+        # только до первой сборки: дальше блоки в памяти, а остальная работа зависит от ответа
+        prefetch = (
+            asyncio.create_task(self._aprefetch())
+            if settings.SPECULATIVE_PREFETCH and settings.RAG_ENABLED and not self.knowledge_base.cag_contexts_ready
+            else None
+        )
+        
+        try:
+            _apply_step(view, updates, await self.get_user_answer(view))
+        except BaseException:
+            # Отмена (Ctrl-C) или ошибка ввода - подготовка больше не нужна
+            if prefetch is not None:
+                prefetch.cancel()
+            raise
+        
+        if view.get("interview_complete"):
+            # Анализа не будет: дожидаемся подготовки, чтобы задача не осталась висеть при закрытии цикла
+            if prefetch is not None:
+                prefetch.cancel()
+                await asyncio.gather(prefetch, return_exceptions=True)
+            return updates
+        
+        if prefetch is not None:
+            await prefetch
+        _apply_step(view, updates, await self.analyze_and_decide(view))
+        return updates
+    
+    async def _aprefetch(self) -> None:
+        """Работа, не зависящая от ответа кандидата: справочные блоки тем базы знаний
+        (первое обращение открывает Chroma и при необходимости заполняет коллекцию)
+        """
+        try:
+            await asyncio.to_thread(self.knowledge_base.cag_contexts)
+        except Exception as e:
+            logger.debug("Ошибка предварительной подготовки: %s", e)
+    
+    async def coordinator_decision(self, state: InterviewState) -> Dict:
+        """Координатор принимает решение о первом вопросе (дальше - вместе с анализом ответа)"""
+        if self.coordinator.should_end_interview(state):
+            self.display.print_agent_action("Coordinator", "Завершаем интервью")
+            return {"interview_complete": True}
+        
+        return self._apply_decision(state, await self.coordinator.adecide_next_step(state))
+    
+    def _apply_decision(self, state: InterviewState, decision: Dict) -> Dict:
+        """Обновления состояния по решению координатора"""
+        updates = {}
+        # История диалога, собранная координатором, пригодится интервьюеру
+        updates["history_cache"] = state.get("history_cache", {})
+        
+        updates["coordinator_instruction"] = decision.get("instruction_to_interviewer", "")
+        
+        if decision.get("action") == "change_topic" and decision.get("new_topic"):
+            updates["current_topic"] = decision["new_topic"]
+            self.display.print_agent_action("Coordinator", f"Меняем тему на '{decision['new_topic']}'")
+        
+        coordinator_thought = f"Решение: {decision.get('action', 'continue')}"
+        if decision.get("reasoning"):
+            coordinator_thought += f", обоснование: {decision.get('reasoning')[:100]}..."
+        
+        # Решение открывает мысли следующего хода
+        updates["current_turn_thoughts"] = [f"[Coordinator]: {coordinator_thought}"]
+        # В общий внутренний монолог - с ограничением длины (список канала без редьюсера, правка на месте безопасна)
+        StateManager.add_internal_thought(state, f"Coordinator: {coordinator_thought}")
+        updates["internal_monologue"] = state["internal_monologue"]
+        
+        # Если решение - завершить интервью
+        if decision.get("action") == "end_interview":
+            updates["interview_complete"] = True
+            self.display.print_agent_action("Coordinator", "Завершаем интервью по решению LLM")
+        
+        return updates
+    
+    async def generate_question(self, state: InterviewState) -> Dict:
+        """Генерация вопроса интервьюером"""
+        updates = {}
+        
+        self.display.print_agent_action("Interviewer", "Генерация вопроса...")
+        question = await self.interviewer.agenerate_question(state)
+        
+        interviewer_thought = f"Сгенерирован вопрос по теме '{state.get('current_topic', 'общая')}'"
+        if state.get("coordinator_instruction"):
+            interviewer_thought += f", инструкция: {state.get('coordinator_instruction')[:100]}..."
+        
+        updates["current_turn_thoughts"] = state["current_turn_thoughts"] + [f"[Interviewer]: {interviewer_thought}"]
+        
+        # Только новое сообщение - редьюсер допишет его к истории без копирования списка
+        updates["messages"] = [Message(
+            role="interviewer",
+            content=question
+        )]
+        updates["current_question"] = question
+        updates["last_question"] = question
+        updates.update(StateManager.record_question(state, question))
+        updates["current_answer"] = ""
+        updates["history_cache"] = state.get("history_cache", {})
+        
+        return updates
+    
+    async def get_user_answer(self, state: InterviewState) -> Dict:
+        """Получение ответа от пользователя"""
+        updates = {}
+        
+        current_question = state.get("current_question", "")
+        
+        if not current_question:
+            messages = state.get("messages", [])
+            for msg in reversed(messages):
+                if msg.role == "interviewer":
+                    current_question = msg.content
+                    break
+        
+        if current_question:
+            self.display.print_question(current_question)
+        else:
+            print("\n Вопрос не найден в состоянии")
+        
+        try:
+            user_input = (await _ainput("Ваш ответ: ")).strip()
+        except EOFError:
+            user_input = "стоп"
+        
+        if user_input.lower() in ["стоп", "stop", "завершить", "конец", "exit", "quit"]:
+            self.display.print_agent_action("System", "Интервью завершено по запросу пользователя")
+            updates["interview_complete"] = True
+            updates["current_answer"] = user_input
+            return updates
+        
+        self.display.print_answer(user_input)
+        
+        updates["current_turn_thoughts"] = state["current_turn_thoughts"] + [
+            f"[System]: Получен ответ длиной {len(user_input)} символов"
+        ]
+        
+        updates["messages"] = [Message(
+            role="user",
+            content=user_input
+        )]
+        updates["current_answer"] = user_input
+        updates["last_answer"] = user_input
+        
+        return updates
+    
+    async def analyze_and_decide(self, state: InterviewState) -> Dict:
+        """Анализ ответа наблюдателем и решение координатора о следующем шаге одним запросом к LLM"""
+        question = state.get("current_question", "")
+        answer = state.get("current_answer", "")
+        
+        if not question or not answer:
+            logger.debug("Observer: нет вопроса или ответа для анализа (вопрос: %r, ответ: %r)", question, answer)
+            return await self.coordinator_decision(state)
+        
+        try:
+            analysis, updated_assessment, decision = await self.observer_coordinator.aanalyze_and_decide(
+                state, question, answer
+            )
+        except Exception as e:
+            logger.exception("Observer: ошибка анализа: %s", e)
+            return await self.coordinator_decision(state)
+        
+        updates = self._record_analysis(state, question, answer, analysis, updated_assessment)
+        
+        # Решения нет - интервью решено завершить (лимит вопросов, запрос кандидата, высокая оценка)
+        if decision is None:
+            updates["interview_complete"] = True
+            self.display.print_agent_action("Coordinator", "Завершаем интервью")
+            return updates
+        
+        updates.update(self._apply_decision(state, decision))
+        return updates
+    
+    def _record_analysis(self, state: InterviewState, question: str, answer: str,
+                         analysis: Dict, updated_assessment: Assessment) -> Dict:
+        """Записывает ход в лог и возвращает обновления состояния по анализу ответа.
+        
+        Мысли хода и инструкцию не сбрасывает: их заменяет следующее решение координатора,
+        а без решения интервью завершается.
+        """
+        # Мысли собираем списком и склеиваем один раз
+        parts = list(state["current_turn_thoughts"])
+        
+        reasoning = analysis.get("reasoning")
+        if reasoning:
+            parts.append(f"[Observer]: {reasoning}")
+        
+        technical_score = analysis.get("technical_score")
+        if technical_score is not None:
+            parts.append(f"[Observer]: Техническая оценка: {technical_score}/10")
+        
+        communication_score = analysis.get("communication_score")
+        if communication_score is not None:
+            parts.append(f"[Observer]: Коммуникационная оценка: {communication_score}/10")
+        
+        recommendation = analysis.get("recommendation_for_next_question")
+        if recommendation:
+            parts.append(f"[Observer]: Рекомендация: {recommendation}")
+        
+        return {
+            "log_data": InterviewLogger.add_turn(
+                state["log_data"],
+                question,
+                answer,
+                "\n".join(parts).strip()
+            ),
+            "assessment": updated_assessment,
+            "observer_recommendation": recommendation or ""
+        }
+    
+    async def generate_feedback(self, state: InterviewState) -> Dict:
+        """Генерация финального фидбэка"""
+        print("\n" + "="*60)
+        print("ГЕНЕРАЦИЯ ФИНАЛЬНОГО ФИДБЭКА")
+        print("="*60)
+        
+        log_data = state["log_data"]
+        
+        duration_minutes = InterviewLogger.elapsed_minutes(log_data)
+        if duration_minutes is None:
+            duration_minutes = 10.0
+        
+        print(f"Длительность интервью: {duration_minutes:.1f} минут")
+        
+        feedback = await self.feedback_gen.agenerate_feedback(state, duration_minutes)
+        
+        log_data = InterviewLogger.save_final_feedback(log_data, feedback)
+        
+        print("\n" + "="*60)
+        print("ИТОГОВЫЙ ФИДБЭК")
+        print("="*60)
+        
+        if isinstance(feedback, dict) and "full_text_feedback" in feedback:
+            print(feedback["full_text_feedback"])
+        elif isinstance(feedback, str):
+            print(feedback)
+        else:
+            print("Фидбэк не в текстовом формате")
+        
+        try:
+            scenario_num = state.get("scenario_number", 1)
+            filename = f"interview_log_{scenario_num}.json"
+            
+            log_file = InterviewLogger.save_to_file(
+                log_data,
+                state["candidate_info"].name,
+                filename
+            )
+            print(f"\nЛог сохранен в: {log_file}")
+            
+        except Exception as e:
+            print(f" Ошибка сохранения лога: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        self.end_interview(state)
+        
+        return {"log_data": log_data, "final_feedback": feedback}
+    
+    def end_interview(self, state: InterviewState) -> None:
+        """Завершение интервью: итоговая статистика"""
+        print("\n" + "="*60)
+        print("ИНТЕРВЬЮ ЗАВЕРШЕНО")
+        print("="*60)
+        
+        turns = len(state["log_data"]["turns"]) if "log_data" in state else 0
+        
+        print(f"\n Статистика:")
+        print(f"   Вопросов задано: {turns}")
+    
+    def check_should_continue(self, state: InterviewState) -> str:
+        """Проверяет, нужно ли продолжать интервью"""
+        if state.get("interview_complete", False):
+            return "end"
+        
+        max_questions = settings.MAX_TURNS
+        questions_asked = len(state.get("questions_asked", []))
+        
+        if questions_asked >= max_questions:
+            print(f"Достигнуто максимальное количество вопросов ({max_questions})")
+            return "end"
+        
+        return "continue"
+    
+    def run(self, candidate_info: CandidateInfo, scenario_number: int = 1, config: Dict = None):
+        """Запуск интервью (синхронная обертка над arun)"""
+        asyncio.run(self.arun(candidate_info, scenario_number, config))
+    
+    async def arun(self, candidate_info: CandidateInfo, scenario_number: int = 1, config: Dict = None):
+        """Запуск интервью"""
+        # Инициализируем состояние с log_data сразу
+        initial_state: InterviewState = {
+            "candidate_info": candidate_info,
+            "messages": [],
+            "internal_monologue": [],
+            "current_topic": "",
+            "difficulty_level": settings.DEFAULT_DIFFICULTY,
+            "assessment": Assessment(),
+            "questions_asked": [],
+            "questions_asked_set": set(),
+            "observer_recommendation": None,
+            "need_feedback": False,
+            "interview_complete": False,
+            "current_agent": "coordinator",
+            "current_question": None,
+            "current_answer": None,
+            "coordinator_instruction": None,
+            "log_data": InterviewLogger.init_log_data(
+                candidate_info, journal_filename=f"interview_log_{scenario_number}.jsonl"
+            ),
+            "current_turn_thoughts": [],
+            "scenario_number": scenario_number,
+            "history_cache": {}
+        }
+        
+        print(f"\n Запуск мультиагентной системы интервью... (Сценарий {scenario_number})")
+        
+        try:
+            thread_id = f"interview_{candidate_info.name}_{candidate_info.position}_{scenario_number}"
+            
+            final_state = await self.app.ainvoke(
+                initial_state,
+                config={"configurable": {"thread_id": thread_id}}
+            )
+            
+            print(f"\n Интервью успешно завершено! (Сценарий {scenario_number})")
+            
+            logger.debug("Финальный лог содержит %s записей", len(final_state.get("log_data", {}).get("turns", [])))
+            
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl-C под asyncio.run приходит в корутину как отмена задачи, а не KeyboardInterrupt.
+            # log_data дополняется узлами на месте, поэтому в initial_state - все записанные ходы
+            print(f"\n\n  Интервью прервано пользователем (Сценарий {scenario_number})")
+            if "log_data" in initial_state and initial_state["log_data"]:
+                try:
+                    filename = f"interview_interrupted_{scenario_number}.json"
+                    InterviewLogger.save_to_file(
+                        initial_state["log_data"],
+                        candidate_info.name,
+                        filename
+                    )
+                    print(f" Лог прерванного интервью сохранен в {filename}")
+                except Exception as e:
+                    print(f" Ошибка сохранения лога при прерывании: {e}")
+        
+        except Exception as e:
+            print(f"\n Ошибка: {e}")
+            import traceback
+            traceback.print_exc()
+        
+        finally:
+            self.observer.save_caches()
\ No newline at end of file
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+import hashlib
+import logging
+import time
+import numpy as np
+from langchain_core.messages import BaseMessage, SystemMessage
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число ответов LLM в кэше
+LLM_CACHE_SIZE = 500
+
+Prompt = Union[str, Sequence[BaseMessage]]
+
+
+class SemanticLLMCache:
+    """Кэш ответов LLM: точное совпадение промпта и поиск похожего промпта по эмбеддингам.
+
+    Ключ точного совпадения - sha256(модель, system-часть, human-часть). Похожим считается
+    промпт той же модели с тем же system-сообщением, у которого косинусная близость
+    human-части не ниже threshold. Кэшируются только детерминированные вызовы (temperature == 0).
+
+    Вызовы с semantic=False используют только точное совпадение: промпты анализа ответа и решения
+    координатора начинаются с длинного общего блока (справочные материалы, профиль кандидата, история),
+    и эмбеддинги разных ответов и разных состояний интервью почти совпадают.
+    """
+
+    def __init__(self, embed_texts: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 max_size: int = LLM_CACHE_SIZE, ttl_seconds: Optional[float] = None,
+                 threshold: Optional[float] = None):
+        # Без функции эмбеддингов работает только точное совпадение
+        self.embed_texts = embed_texts
+        self.max_size = max_size
+        self.ttl_seconds = settings.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        # ключ -> (время записи, ключ system-части, нормированный эмбеддинг или None, ответ)
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[np.ndarray], str]]" = OrderedDict()
+        # Последний посчитанный эмбеддинг: get при промахе и следующий set embed-ят один и тот же текст
+        self._last_embedding: Tuple[Optional[str], Optional[np.ndarray]] = (None, None)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_cacheable(llm: Any) -> bool:
+        """Кэшировать можно только детерминированную генерацию"""
+        return getattr(llm, "temperature", None) in (0, None)
+
+    @staticmethod
+    def _split_prompt(prompt: Prompt) -> Tuple[str, str]:
+        """(system-часть, остальные сообщения) промпта в виде текста"""
+        if isinstance(prompt, str):
+            return "", prompt
+        system = "\n".join(str(m.content) for m in prompt if isinstance(m, SystemMessage))
+        user = "\n".join(str(m.content) for m in prompt if not isinstance(m, SystemMessage))
+        return system, user
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embed_texts is None:
+            return None
+        if self._last_embedding[0] == text:
+            return self._last_embedding[1]
+        try:
+            vector = self.embed_texts([text])[0]
+            self._last_embedding = (text, vector)
+            return vector
+        except Exception as e:
+            logger.warning("Ошибка построения эмбеддинга промпта: %s", e)
+            return None
+
+    def _expired(self, stored_at: float) -> bool:
+        return bool(self.ttl_seconds) and time.monotonic() - stored_at > self.ttl_seconds
+
+    def get(self, llm: Any, prompt: Prompt, semantic: bool = True) -> Optional[str]:
+        """Готовый ответ на такой же (или, при semantic, похожий) промпт; None - идти в LLM"""
+        if not self.is_cacheable(llm):
+            return None
+
+        model = str(getattr(llm, "model", type(llm).__name__))
+        system, user = self._split_prompt(prompt)
+        key = self._hash(model, system, user)
+        if key not in self._entries:
+            key = self._find_similar(self._hash(model, system), user) if semantic else None
+
+        entry = self._entries.get(key) if key is not None else None
+        if entry is None or self._expired(entry[0]):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        logger.debug("Ответ LLM взят из кэша (попаданий: %s)", self.hits)
+        return entry[3]
+
+    def _find_similar(self, group: str, user: str) -> Optional[str]:
+        """Ключ самой близкой записи той же модели и system-части, если близость не ниже порога"""
+        keys = [key for key, entry in self._entries.items()
+                if entry[1] == group and entry[2] is not None and not self._expired(entry[0])]
+        if not keys:
+            return None
+
+        vector = self._embed(user)
+        if vector is None:
+            return None
+
+        # Эмбеддинги нормированы: скалярное произведение = косинусная близость
+        scores = np.stack([self._entries[key][2] for key in keys]) @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.threshold else None
+
+    def set(self, llm: Any, prompt: Prompt, content: str, semantic: bool = True) -> None:
+        """Запоминает ответ LLM на промпт, вытесняя самые давние записи.
+
+        Запись с semantic=False не получает эмбеддинг и находится только по точному совпадению.
+        """
+        if not self.is_cacheable(llm) or not content:
+            return
+
+        model = str(getattr(llm, "model", type(llm).__name__))
+        system, user = self._split_prompt(prompt)
+        key = self._hash(model, system, user)
+        vector = self._embed(user) if semantic else None
+        self._entries[key] = (time.monotonic(), self._hash(model, system), vector, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
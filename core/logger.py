@@ -1,117 +1,179 @@
-import json
-from datetime import datetime
-from typing import Dict, Any, Optional
-from pathlib import Path
-from config.settings import settings
-from .state import CandidateInfo
-
-class InterviewLogger:
-    """Утилита для логирования. Хранит данные в состоянии, а не в себе."""
-    
-    @staticmethod
-    def init_log_data(candidate_info: CandidateInfo) -> Dict[str, Any]:
-        """Инициализирует структуру лога в состоянии"""
-        return {
-            "participant_name": candidate_info.name,
-            "turns": [],
-            "final_feedback": "",
-            "start_time": datetime.now().isoformat()
-        }
-    
-    @staticmethod
-    def format_agent_thoughts(thoughts_list: list[str]) -> str:
-        """Форматирует мысли агентов согласно ТЗ"""
-        formatted = ""
-        for thought in thoughts_list:
-            if not thought.startswith("["):
-                continue
-            formatted += f"{thought}\n"
-        return formatted.strip()
-    
-    @staticmethod
-    def add_turn(log_data: Dict[str, Any], 
-                 agent_visible_message: str, 
-                 user_message: str, 
-                 internal_thoughts: str) -> Dict[str, Any]:
-        """Добавляет ход в лог"""
-        turn = {
-            "turn_id": len(log_data["turns"]) + 1,
-            "agent_visible_message": agent_visible_message,
-            "user_message": user_message,
-            "internal_thoughts": internal_thoughts
-        }
-        
-        log_data["turns"].append(turn)
-        print(f"ЗАПИСЬ В ЛОГ: Turn {turn['turn_id']} добавлен")
-        
-        print(f"Вопрос: {agent_visible_message[:80]}...")
-        print(f"Ответ: {user_message[:80]}...")
-        print(f"Мысли агентов: {internal_thoughts[:100]}...")
-        
-        return log_data
-    
-    @staticmethod
-    def save_final_feedback(log_data: Dict[str, Any], feedback: Dict[str, Any]) -> Dict[str, Any]:
-        """Сохраняет финальный фидбэк"""
-        if isinstance(feedback, dict) and "full_text_feedback" in feedback:
-            log_data["final_feedback"] = feedback["full_text_feedback"]
-        elif isinstance(feedback, str):
-            log_data["final_feedback"] = feedback
-        else:
-            log_data["final_feedback"] = str(feedback)
-        
-        if "end_time" not in log_data:
-            log_data["end_time"] = datetime.now().isoformat()
-        
-        if "start_time" in log_data:
-            start = datetime.fromisoformat(log_data["start_time"])
-            end = datetime.fromisoformat(log_data["end_time"])
-            log_data["duration_minutes"] = round((end - start).total_seconds() / 60, 2)
-        else:
-            log_data["duration_minutes"] = 0
-        
-        return log_data
-    
-    @staticmethod
-    def save_to_file(log_data: Dict[str, Any], 
-                     candidate_name: str,
-                     filename: Optional[str] = None) -> Path:
-        """Сохраняет лог в файл"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_name = "".join(c for c in candidate_name if c.isalnum() or c in ' _-')
-            filename = f"interview_{safe_name}_{timestamp}.json"
-        
-        filepath = Path(settings.LOG_DIR) / filename
-        
-        output_data = {
-            "participant_name": log_data["participant_name"],
-            "turns": log_data["turns"],
-            "final_feedback": log_data["final_feedback"]
-        }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"Лог сохранен: {filepath}")
-        
-        InterviewLogger._verify_log(output_data)
-        
-        return filepath
-    
-    @staticmethod
-    def _verify_log(data: Dict[str, Any]):
-        """Проверяет структуру лога"""
-        print(f"\n ПРОВЕРКА СТРУКТУРЫ ЛОГА:")
-        print(f"Имя участника: {data.get('participant_name')}")
-        print(f"Количество turns: {len(data.get('turns', []))}")
-        
-        if data.get('turns'):
-            print(f"   • Пример turn:")
-            turn = data['turns'][0]
-            print(f" - ID: {turn.get('turn_id')}")
-            print(f" - Вопрос: {turn.get('agent_visible_message', '')[:60]}...")
-            print(f" - Ответ: {turn.get('user_message', '')[:60]}...")
-            print(f" - Мысли: {turn.get('internal_thoughts', '')[:60]}...")
-        else:
-            print(f"ВНИМАНИЕ: turns пустые!")
\ No newline at end of file
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+from config.settings import settings
+from .state import CandidateInfo
+
+try:
+    import orjson  # необязательная зависимость, в разы быстрее сериализует JSON
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _dump_json(data: Dict[str, Any]) -> bytes:
+    """JSON с отступом в 2 пробела и кириллицей без экранирования, в UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _dump_json_line(data: Dict[str, Any]) -> bytes:
+    """Одна строка JSONL в UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(data) + b"\n"
+    return json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class InterviewLogger:
+    """Утилита для логирования. Хранит данные в состоянии, а не в себе."""
+    
+    @staticmethod
+    def init_log_data(candidate_info: CandidateInfo,
+                      journal_filename: Optional[str] = None) -> Dict[str, Any]:
+        """Инициализирует структуру лога в состоянии.
+        
+        С journal_filename каждый ход еще и дописывается строкой в JSONL-журнал в LOG_DIR:
+        если процесс упадет посреди интервью, завершенные ходы останутся на диске.
+        """
+        # Служебные поля с "_" в итоговый файл не попадают
+        log_data = {
+            "participant_name": candidate_info.name,
+            "turns": [],
+            "final_feedback": "",
+            "start_time": datetime.now().isoformat(),
+            # Точка отсчета длительности: без разбора ISO-строки и без скачков системных часов
+            "_start_monotonic": time.monotonic()
+        }
+        
+        if journal_filename is not None:
+            journal_path = Path(settings.LOG_DIR) / journal_filename
+            journal_path.write_bytes(b"")
+            log_data["_journal_path"] = str(journal_path)
+        
+        return log_data
+    
+    @staticmethod
+    def format_agent_thoughts(thoughts_list: list[str]) -> str:
+        """Форматирует мысли агентов согласно ТЗ"""
+        return "\n".join(thought for thought in thoughts_list if thought.startswith("[")).strip()
+    
+    @staticmethod
+    def add_turn(log_data: Dict[str, Any], 
+                 agent_visible_message: str, 
+                 user_message: str, 
+                 internal_thoughts: str) -> Dict[str, Any]:
+        """Добавляет ход в лог"""
+        turn = {
+            "turn_id": len(log_data["turns"]) + 1,
+            "agent_visible_message": agent_visible_message,
+            "user_message": user_message,
+            "internal_thoughts": internal_thoughts
+        }
+        
+        log_data["turns"].append(turn)
+        
+        # В журнал дописывается только новый ход, без перезаписи предыдущих
+        if "_journal_path" in log_data:
+            with open(log_data["_journal_path"], "ab") as f:
+                f.write(_dump_json_line(turn))
+        logger.debug(
+            "Запись в лог: turn %s добавлен. Вопрос: %.80s... Ответ: %.80s... Мысли агентов: %.100s...",
+            turn["turn_id"], agent_visible_message, user_message, internal_thoughts
+        )
+        
+        return log_data
+    
+    @staticmethod
+    def save_final_feedback(log_data: Dict[str, Any], feedback: Dict[str, Any]) -> Dict[str, Any]:
+        """Сохраняет финальный фидбэк"""
+        if isinstance(feedback, dict) and "full_text_feedback" in feedback:
+            log_data["final_feedback"] = feedback["full_text_feedback"]
+        elif isinstance(feedback, str):
+            log_data["final_feedback"] = feedback
+        else:
+            log_data["final_feedback"] = str(feedback)
+        
+        if "end_time" not in log_data:
+            log_data["end_time"] = datetime.now().isoformat()
+        
+        duration_minutes = InterviewLogger.elapsed_minutes(log_data)
+        log_data["duration_minutes"] = round(duration_minutes, 2) if duration_minutes is not None else 0
+        
+        return log_data
+    
+    @staticmethod
+    def elapsed_minutes(log_data: Dict[str, Any]) -> Optional[float]:
+        """Длительность интервью в минутах; None, если время начала неизвестно"""
+        if "_start_monotonic" in log_data:
+            return (time.monotonic() - log_data["_start_monotonic"]) / 60
+        # Лог создан не через init_log_data - считаем по ISO-строке
+        if "start_time" in log_data:
+            return (datetime.now() - datetime.fromisoformat(log_data["start_time"])).total_seconds() / 60
+        return None
+    
+    @staticmethod
+    def save_to_file(log_data: Dict[str, Any], 
+                     candidate_name: str,
+                     filename: Optional[str] = None) -> Path:
+        """Сохраняет лог в файл"""
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_name = "".join(c for c in candidate_name if c.isalnum() or c in ' _-')
+            filename = f"interview_{safe_name}_{timestamp}.json"
+        
+        filepath = Path(settings.LOG_DIR) / filename
+        
+        journal_path = log_data.get("_journal_path")
+        turns = log_data["turns"]
+        if not turns and journal_path:
+            # Ходов в памяти нет (восстановление после сбоя) - берем их из журнала
+            turns = InterviewLogger.read_journal(journal_path)
+        
+        output_data = {
+            "participant_name": log_data["participant_name"],
+            "turns": turns,
+            "final_feedback": log_data["final_feedback"]
+        }
+        
+        filepath.write_bytes(_dump_json(output_data))
+        
+        # Все ходы теперь в полном логе - журнал больше не нужен
+        if journal_path:
+            Path(journal_path).unlink(missing_ok=True)
+        
+        logger.debug("Лог сохранен: %s", filepath)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            InterviewLogger._verify_log(output_data)
+        
+        return filepath
+    
+    @staticmethod
+    def read_journal(journal_path: str) -> List[Dict[str, Any]]:
+        """Читает ходы из JSONL-журнала; пустой список, если журнала нет"""
+        path = Path(journal_path)
+        if not path.exists():
+            return []
+        
+        loads = orjson.loads if orjson is not None else json.loads
+        return [loads(line) for line in path.read_bytes().splitlines() if line.strip()]
+    
+    @staticmethod
+    def _verify_log(data: Dict[str, Any]):
+        """Проверяет структуру лога (вывод в отладочный лог)"""
+        logger.debug("Проверка структуры лога: участник %s, turns: %s, фидбэк: %s",
+                     data.get('participant_name'), len(data.get('turns', [])),
+                     'Да' if data.get('final_feedback') else 'Нет')
+        
+        if data.get('turns'):
+            turn = data['turns'][0]
+            logger.debug("Пример turn: ID %s, вопрос: %.60s..., ответ: %.60s..., мысли: %.60s...",
+                         turn.get('turn_id'), turn.get('agent_visible_message', ''),
+                         turn.get('user_message', ''), turn.get('internal_thoughts', ''))
+        else:
+            logger.warning("Turns в логе пустые")
@@ -1,161 +1,633 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple, Optional
-import os
-import warnings
-
-# Отключаем предупреждения HF Hub
-os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
-os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
-warnings.filterwarnings("ignore", message=".*unauthenticated requests.*")
-
-from pathlib import Path
-from config.settings import settings
-import json
-
-class KnowledgeBase:
-    """RAG система для проверки технических знаний"""
-    
-    def __init__(self, collection_name: str = "tech_interview_kb"):
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_PERSIST_DIR,
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
-        
-        try:
-            self.collection = self.client.get_collection(collection_name)
-            print(f"Загружена существующая коллекция: {collection_name}")
-        except:
-            self.collection = self.client.create_collection(collection_name)
-            print(f"Создана новая коллекция: {collection_name}")
-            self._load_default_knowledge()
-    
-    def _load_default_knowledge(self):
-        """Загружаем базовые знания если коллекция пуста"""
-        default_knowledge = [
-            {
-                "text": "Python - интерпретируемый язык программирования высокого уровня с динамической типизацией.",
-                "metadata": {"topic": "python", "subtopic": "basics", "difficulty": 1}
-            },
-            {
-                "text": "Список (list) в Python - изменяемая последовательность элементов. Сложность доступа по индексу O(1).",
-                "metadata": {"topic": "python", "subtopic": "data_structures", "difficulty": 1}
-            },
-            {
-                "text": "Словарь (dict) - структура данных ключ-значение. В среднем O(1) для операций поиска, вставки, удаления.",
-                "metadata": {"topic": "python", "subtopic": "data_structures", "difficulty": 1}
-            },
-            {
-                "text": "Декоратор в Python - функция, которая принимает другую функцию и расширяет её функциональность, не изменяя её код.",
-                "metadata": {"topic": "python", "subtopic": "advanced", "difficulty": 3}
-            },
-            {
-                "text": "GIL (Global Interpreter Lock) в CPython позволяет выполнять только один поток Python одновременно.",
-                "metadata": {"topic": "python", "subtopic": "concurrency", "difficulty": 4}
-            },
-            {
-                "text": "SQL JOIN объединяет строки из двух или более таблиц на основе связанного столбца между ними. Типы: INNER, LEFT, RIGHT, FULL.",
-                "metadata": {"topic": "databases", "subtopic": "sql", "difficulty": 2}
-            },
-            {
-                "text": "Индекс в базе данных ускоряет поиск, но замедляет вставку и обновление. Используется B-дерево или hash индексы.",
-                "metadata": {"topic": "databases", "subtopic": "performance", "difficulty": 3}
-            },
-            {
-                "text": "REST API использует HTTP методы: GET (получить), POST (создать), PUT (обновить), DELETE (удалить).",
-                "metadata": {"topic": "web", "subtopic": "api", "difficulty": 2}
-            },
-            {
-                "text": "Docker контейнер - изолированная среда для запуска приложений. Образ - шаблон для создания контейнеров.",
-                "metadata": {"topic": "devops", "subtopic": "containers", "difficulty": 2}
-            },
-        ]
-        
-        documents = [item["text"] for item in default_knowledge]
-        metadatas = [item["metadata"] for item in default_knowledge]
-        ids = [f"doc_{i}" for i in range(len(documents))]
-        
-        embeddings = self.embedding_model.encode(documents).tolist()
-        
-        self.collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print(f"Загружено {len(documents)} документов в базу знаний")
-
-
-    def verify_technical_answer(self, question: str, answer: str, topic: str = None) -> Dict:
-        """Проверяет технический ответ через RAG"""
-        
-        try:
-            # Если RAG отключен или нет базы знаний
-            if not self.documents or len(self.documents) == 0:
-                return {
-                    "is_correct": None,
-                    "confidence": 0.5,
-                    "correct_info": "База знаний пуста",
-                    "suggested_topics": []
-                }
-            
-            # Получаем релевантные документы
-            query = f"Вопрос: {question}. Ответ: {answer}"
-            
-            # Безопасное получение документов
-            relevant_docs = []
-            try:
-                relevant_docs = self.get_relevant_documents(query, limit=3)
-            except Exception as e:
-                print(f"Ошибка при поиске документов: {e}")
-            
-            if not relevant_docs:
-                return {
-                    "is_correct": None,
-                    "confidence": 0.3,
-                    "correct_info": "Не найдено релевантной информации в базе знаний",
-                    "suggested_topics": []
-                }
-            
-            # Анализируем соответствие
-            correct_answer = relevant_docs[0]["content"][:500] if relevant_docs else "Нет данных"
-            
-            # Простая проверка на соответствие (можно улучшить)
-            score = 0
-            if answer and len(answer) > 10:
-                # Проверяем ключевые слова
-                keywords = ["список", "list", "кортеж", "tuple", "изменяемый", "immutable", "изменять", "мутабельный"]
-                found_keywords = sum(1 for kw in keywords if kw.lower() in answer.lower())
-                score = min(1.0, found_keywords / 4)
-            
-            return {
-                "is_correct": score > 0.5,
-                "confidence": score,
-                "correct_info": f"Согласно базе знаний: {correct_answer[:200]}...",
-                "suggested_topics": [topic] if topic else []
-            }
-            
-        except Exception as e:
-            print(f"Ошибка в RAG системе: {e}")
-            return {
-                "is_correct": None,
-                "confidence": 0.3,
-                "correct_info": f"Ошибка при проверке: {str(e)[:100]}",
-                "suggested_topics": []
-            }
-    
-    def add_custom_knowledge(self, documents: List[str], metadatas: List[Dict]):
-        """Добавить кастомные знания в базу"""
-        embeddings = self.embedding_model.encode(documents).tolist()
-        start_id = len(self.collection.get()["ids"]) if self.collection.get()["ids"] else 0
-        ids = [f"custom_{start_id + i}" for i in range(len(documents))]
-        
-        self.collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print(f"Добавлено {len(documents)} кастомных документов")
\ No newline at end of file
+from typing import TYPE_CHECKING, Any, List, Dict, Tuple, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import numpy as np
+import warnings
+
+# Отключаем предупреждения HF Hub
+os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
+os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
+warnings.filterwarnings("ignore", message=".*unauthenticated requests.*")
+
+from pathlib import Path
+from config.settings import settings
+import json
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+# Максимум тем в одном пакетном запросе материалов
+LEARNING_RESOURCES_BATCH_SIZE = 16
+
+# Сколько результатов проверки ответов держать в кэше
+VERIFICATION_CACHE_SIZE = 512
+
+# Сколько эмбеддингов текстов держать в кэше
+EMBEDDING_CACHE_SIZE = 1024
+
+# Размер пачки текстов для одного прохода модели эмбеддингов
+EMBEDDING_BATCH_SIZE = 32
+
+# Размер пачки при загрузке документов в базу знаний
+DOCUMENT_BATCH_SIZE = 64
+
+# Предел размера справочного блока темы для промпта (~8000 токенов)
+CAG_CONTEXT_MAX_CHARS = 24000
+
+# До такого числа документов поиск идет точным перебором векторов в памяти,
+# а не через HNSW-индекс Chroma
+FLAT_INDEX_MAX_DOCUMENTS = 1000
+
+# MMR при поиске справочных документов: вес близости к запросу против непохожести
+# на уже выбранные документы, и во сколько раз больше кандидатов берется для отбора
+MMR_LAMBDA = 0.7
+MMR_FETCH_FACTOR = 4
+
+# Точный индекс небольшой базы: (векторы int8, масштаб каждого вектора, документы, metadata)
+_FlatIndex = Tuple[np.ndarray, np.ndarray, List[str], List[Dict]]
+
+# После стольких ошибок подряд база знаний считается недоступной
+MAX_CONSECUTIVE_FAILURES = 2
+# Через столько секунд недоступная база опрашивается снова одним пробным запросом
+FAILURE_COOLDOWN_SECONDS = 30.0
+
+# Ключевые слова для простой проверки ответа. Ни одно не входит в другое,
+# поэтому один проход регулярным выражением находит каждое из встреченных
+_ANSWER_KEYWORDS = ("список", "list", "кортеж", "tuple", "изменяемый", "immutable", "изменять", "мутабельный")
+_ANSWER_KEYWORDS_RE = re.compile("|".join(map(re.escape, _ANSWER_KEYWORDS)))
+
+# Загруженные модели эмбеддингов (имя -> модель): одна на процесс для всех экземпляров KnowledgeBase
+_embedding_models: Dict[str, "SentenceTransformer"] = {}
+_embedding_models_lock = threading.Lock()
+
+
+def get_encoder(model_name: Optional[str] = None) -> "SentenceTransformer":
+    """Модель эмбеддингов (по умолчанию EMBEDDING_MODEL из настроек); загружается при первом обращении"""
+    model_name = model_name or settings.EMBEDDING_MODEL
+    with _embedding_models_lock:
+        if model_name not in _embedding_models:
+            # Тяжелый импорт (torch) - только когда модель действительно нужна
+            from sentence_transformers import SentenceTransformer
+            _embedding_models[model_name] = SentenceTransformer(model_name)
+        return _embedding_models[model_name]
+
+
+def _mmr_select(query_similarities: np.ndarray, candidates: np.ndarray, limit: int,
+                lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """Индексы кандидатов в порядке Maximal Marginal Relevance.
+    
+    Сходства кандидатов между собой считаются одной матрицей; на каждом шаге
+    максимальное сходство с уже выбранными обновляется векторно, без цикла по выбранным.
+    """
+    pair_similarities = candidates @ candidates.T
+    available = np.ones(len(candidates), dtype=bool)
+    # Пока ничего не выбрано, штрафа нет: первым берется самый близкий к запросу
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    selected: List[int] = []
+    
+    for _ in range(min(limit, len(candidates))):
+        scores = lambda_mult * query_similarities - (1 - lambda_mult) * redundancy
+        best = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pair_similarities[best], out=redundancy)
+    
+    return selected
+
+
+class QueryCache:
+    """Потокобезопасный LRU-кэш с необязательным сроком жизни записей.
+    
+    Считает попадания и промахи; к кэшам базы знаний обращаются из потоков asyncio.to_thread.
+    """
+    
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # ключ -> (время записи по time.monotonic, значение); порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Значение по ключу; None, если его нет или срок жизни истек"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Any, value: Any) -> None:
+        """Сохраняет значение, вытесняя самые давно использованные записи"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def values(self) -> List[Any]:
+        """Снимок непросроченных значений от давно использованных к недавним; порядок LRU не меняется"""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                value for stored_at, value in self._entries.values()
+                if self.ttl_seconds is None or now - stored_at < self.ttl_seconds
+            ]
+    
+    def clear(self) -> None:
+        """Удаляет все записи (например, после изменения базы знаний)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class KnowledgeBase:
+    """RAG система для проверки технических знаний"""
+    
+    def __init__(self, collection_name: str = "tech_interview_kb"):
+        # Модель и коллекция загружаются при первом обращении, а не при создании workflow
+        self.collection_name = collection_name
+        self.client = None
+        self._collection = None
+        self._collection_lock = threading.Lock()
+        # Ошибки поиска материалов подряд и время последней ошибки (или пробного запроса)
+        self._consecutive_failures = 0
+        self._last_failure_at = 0.0
+        # Результаты проверки ответов: хэш нормализованных (вопрос, ответ, тема) -> результат
+        self._verification_cache = QueryCache(VERIFICATION_CACHE_SIZE, ttl_seconds=settings.CACHE_TTL_SECONDS)
+        # Кэш эмбеддингов: хэш текста -> нормированный вектор
+        self._embedding_cache = QueryCache(EMBEDDING_CACHE_SIZE)
+        # Справочные блоки по темам базы знаний (тема из metadata -> текст); None - еще не собраны
+        self._cag_contexts: Optional[Dict[str, str]] = None
+        # Точный индекс небольшой базы (см. _FlatIndex); None - не используется
+        self._flat_index: Optional[_FlatIndex] = None
+        self._flat_index_ready = False
+        self._flat_index_lock = threading.Lock()
+    
+    @property
+    def embedding_model(self) -> "SentenceTransformer":
+        """Общая для процесса модель эмбеддингов из настроек"""
+        return get_encoder()
+    
+    @property
+    def collection(self):
+        """Коллекция Chroma; клиент создается при первом обращении"""
+        with self._collection_lock:
+            if self._collection is None:
+                import chromadb
+                from chromadb.config import Settings as ChromaSettings
+                
+                self.client = chromadb.PersistentClient(
+                    path=settings.CHROMA_PERSIST_DIR,
+                    settings=ChromaSettings(anonymized_telemetry=False)
+                )
+                
+                # Явная проверка вместо except: ошибка доступа к Chroma не должна
+                # приводить к созданию коллекции и повторному кодированию базы.
+                # Chroma до 0.6 возвращает объекты коллекций, начиная с 0.6 - имена
+                existing = {getattr(item, "name", item) for item in self.client.list_collections()}
+                if self.collection_name in existing:
+                    self._collection = self.client.get_collection(self.collection_name)
+                    logger.info("Загружена существующая коллекция: %s", self.collection_name)
+                else:
+                    # Векторы нормированы, поэтому скалярное произведение равно косинусу и дешевле L2.
+                    # У коллекций, созданных раньше, остается L2 - на единичных векторах порядок тот же
+                    self._collection = self.client.create_collection(
+                        self.collection_name, metadata={"hnsw:space": "ip"}
+                    )
+                    logger.info("Создана новая коллекция: %s", self.collection_name)
+                    self._load_default_knowledge(self._collection)
+        
+        return self._collection
+    
+    def _load_default_knowledge(self, collection):
+        """Загружаем базовые знания если коллекция пуста"""
+        default_knowledge = [
+            {
+                "text": "Python - интерпретируемый язык программирования высокого уровня с динамической типизацией.",
+                "metadata": {"topic": "python", "subtopic": "basics", "difficulty": 1}
+            },
+            {
+                "text": "Список (list) в Python - изменяемая последовательность элементов. Сложность доступа по индексу O(1).",
+                "metadata": {"topic": "python", "subtopic": "data_structures", "difficulty": 1}
+            },
+            {
+                "text": "Словарь (dict) - структура данных ключ-значение. В среднем O(1) для операций поиска, вставки, удаления.",
+                "metadata": {"topic": "python", "subtopic": "data_structures", "difficulty": 1}
+            },
+            {
+                "text": "Декоратор в Python - функция, которая принимает другую функцию и расширяет её функциональность, не изменяя её код.",
+                "metadata": {"topic": "python", "subtopic": "advanced", "difficulty": 3}
+            },
+            {
+                "text": "GIL (Global Interpreter Lock) в CPython позволяет выполнять только один поток Python одновременно.",
+                "metadata": {"topic": "python", "subtopic": "concurrency", "difficulty": 4}
+            },
+            {
+                "text": "SQL JOIN объединяет строки из двух или более таблиц на основе связанного столбца между ними. Типы: INNER, LEFT, RIGHT, FULL.",
+                "metadata": {"topic": "databases", "subtopic": "sql", "difficulty": 2}
+            },
+            {
+                "text": "Индекс в базе данных ускоряет поиск, но замедляет вставку и обновление. Используется B-дерево или hash индексы.",
+                "metadata": {"topic": "databases", "subtopic": "performance", "difficulty": 3}
+            },
+            {
+                "text": "REST API использует HTTP методы: GET (получить), POST (создать), PUT (обновить), DELETE (удалить).",
+                "metadata": {"topic": "web", "subtopic": "api", "difficulty": 2}
+            },
+            {
+                "text": "Docker контейнер - изолированная среда для запуска приложений. Образ - шаблон для создания контейнеров.",
+                "metadata": {"topic": "devops", "subtopic": "containers", "difficulty": 2}
+            },
+        ]
+        
+        documents = [item["text"] for item in default_knowledge]
+        metadatas = [item["metadata"] for item in default_knowledge]
+        ids = [f"doc_{i}" for i in range(len(documents))]
+        
+        embeddings = self._encode_documents(documents)
+        
+        collection.add(
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+        logger.info("Загружено %s документов в базу знаний", len(documents))
+
+
+    def verify_technical_answer(self, question: str, answer: str, topic: str = None) -> Dict:
+        """Проверяет технический ответ через RAG.
+        
+        Результат зависит только от (вопрос, ответ, тема) и кэшируется без учета регистра
+        и крайних пробелов; ошибки поиска не кэшируются.
+        """
+        cache_key = hashlib.blake2b(
+            f"{question.strip().lower()}|{answer.strip().lower()}|{topic}".encode("utf-8")
+        ).digest()
+        result = self._verification_cache.get(cache_key)
+        if result is None:
+            try:
+                result = self._verify_technical_answer(question, answer, topic)
+            except Exception as e:
+                logger.warning("Ошибка в RAG системе: %s", e)
+                return {
+                    "is_correct": None,
+                    "confidence": 0.3,
+                    "correct_info": f"Ошибка при проверке: {str(e)[:100]}",
+                    "suggested_topics": []
+                }
+            self._verification_cache.put(cache_key, result)
+        
+        # Копия, чтобы вызывающий код не мог испортить закэшированный результат
+        return {**result, "suggested_topics": list(result["suggested_topics"])}
+    
+    def _verify_technical_answer(self, question: str, answer: str, topic: str = None) -> Dict:
+        """Проверка ответа по базе знаний без кэша; исключения пробрасываются наружу"""
+        # Если нет базы знаний
+        if self.collection.count() == 0:
+            return {
+                "is_correct": None,
+                "confidence": 0.5,
+                "correct_info": "База знаний пуста",
+                "suggested_topics": []
+            }
+        
+        # Получаем релевантные документы
+        relevant_docs = self.get_relevant_documents(self._verification_query(question, answer), limit=3)
+        
+        if not relevant_docs:
+            return {
+                "is_correct": None,
+                "confidence": 0.3,
+                "correct_info": "Не найдено релевантной информации в базе знаний",
+                "suggested_topics": []
+            }
+        
+        # Анализируем соответствие
+        correct_answer = relevant_docs[0]["content"][:500]
+        
+        # Простая проверка на соответствие (можно улучшить)
+        score = 0
+        if answer and len(answer) > 10:
+            # Проверяем ключевые слова: сколько разных встретилось в ответе
+            found_keywords = len(set(_ANSWER_KEYWORDS_RE.findall(answer.lower())))
+            score = min(1.0, found_keywords / 4)
+        
+        return {
+            "is_correct": score > 0.5,
+            "confidence": score,
+            "correct_info": f"Согласно базе знаний: {correct_answer[:200]}...",
+            "suggested_topics": [topic] if topic else []
+        }
+    
+    def cag_contexts(self) -> Dict[str, str]:
+        """Справочные блоки по всем темам базы знаний: документы темы по возрастанию сложности.
+        
+        База знаний маленькая и меняется редко, поэтому блоки собираются один раз
+        и целиком подставляются в промпт вместо поиска на каждом ходе.
+        """
+        if self._cag_contexts is None:
+            data = self.collection.get(include=["documents", "metadatas"])
+            documents_by_topic: Dict[str, List[Tuple[int, str]]] = {}
+            for document, metadata in zip(data["documents"], data["metadatas"]):
+                metadata = metadata or {}
+                documents_by_topic.setdefault(metadata.get("topic", "general"), []).append(
+                    (metadata.get("difficulty", 0), document)
+                )
+            
+            self._cag_contexts = {
+                topic: "\n".join(f"- {document}" for _, document in sorted(items))[:CAG_CONTEXT_MAX_CHARS]
+                for topic, items in documents_by_topic.items()
+            }
+        
+        return self._cag_contexts
+    
+    @property
+    def cag_contexts_ready(self) -> bool:
+        """Собраны ли справочные блоки (тогда cag_contexts не обращается к Chroma)"""
+        return self._cag_contexts is not None
+    
+    def build_cag_context(self, topic: str, max_chars: int = CAG_CONTEXT_MAX_CHARS) -> str:
+        """Справочный блок для темы интервью; пустая строка, если в базе нет подходящей темы.
+        
+        Тема базы знаний подходит, если ее название входит в тему интервью ("python" -> "Python basics").
+        """
+        topic_lower = (topic or "").lower()
+        blocks = [context for kb_topic, context in self.cag_contexts().items() if kb_topic in topic_lower]
+        return "\n".join(blocks)[:max_chars]
+    
+    @staticmethod
+    def _verification_query(question: str, answer: str) -> str:
+        """Текст запроса к базе знаний для проверки ответа"""
+        return f"Вопрос: {question}. Ответ: {answer}"
+    
+    def get_relevant_documents(self, query: str, limit: int = 3) -> List[Dict]:
+        """Ищет в базе знаний документы, ближайшие к запросу, без почти одинаковых (MMR)"""
+        return self.search_batch([query], limit, mmr=True)[0]
+    
+    def search_batch(self, queries: List[str], limit: int = 3, mmr: bool = False) -> List[List[Dict]]:
+        """Ищет документы сразу для нескольких запросов: один вызов модели и один запрос к индексу.
+        
+        С mmr=True из MMR_FETCH_FACTOR * limit ближайших кандидатов отбираются limit
+        разнообразных: первый результат тот же, остальные не повторяют уже выбранные.
+        """
+        query_vectors = self._encode(queries)
+        fetch_limit = limit * MMR_FETCH_FACTOR if mmr else limit
+        
+        flat_index = self._get_flat_index()
+        if flat_index is not None:
+            if not mmr:
+                return self._search_flat(flat_index, query_vectors, limit)
+            codes, scales, documents, metadatas = flat_index
+            rows = self._flat_top(flat_index, query_vectors, fetch_limit)
+            found = [[{"content": documents[i], "metadata": metadatas[i]} for i in row] for row in rows]
+            candidate_vectors = [codes[row] * scales[row, None] for row in rows]
+        else:
+            results = self.collection.query(
+                query_embeddings=query_vectors.tolist(),
+                n_results=fetch_limit,
+                include=["documents", "metadatas", "embeddings"] if mmr else ["documents", "metadatas"]
+            )
+            found = [
+                [{"content": document, "metadata": metadata} for document, metadata in zip(documents, metadatas)]
+                for documents, metadatas in zip(results["documents"], results["metadatas"])
+            ]
+            if not mmr:
+                return found
+            candidate_vectors = [np.ascontiguousarray(vectors, dtype=np.float32) for vectors in results["embeddings"]]
+        
+        reranked = []
+        for query_vector, candidates, vectors in zip(query_vectors, found, candidate_vectors):
+            if len(candidates) <= 1:
+                reranked.append(candidates)
+                continue
+            order = _mmr_select(vectors @ query_vector, vectors, limit)
+            reranked.append([candidates[i] for i in order])
+        return reranked
+    
+    def _get_flat_index(self) -> Optional[_FlatIndex]:
+        """Точный индекс по скалярному произведению для небольшой базы (None - искать через Chroma).
+        
+        На нескольких десятках документов HNSW не дает выигрыша, а запрос к Chroma
+        дороже самого поиска: перебор матрицы нормированных векторов быстрее и точен.
+        """
+        with self._flat_index_lock:
+            if not self._flat_index_ready:
+                self._flat_index = self._build_flat_index()
+                self._flat_index_ready = True
+            return self._flat_index
+    
+    def _build_flat_index(self) -> Optional[_FlatIndex]:
+        """Выгружает векторы базы один раз; большие и пустые базы остаются в Chroma.
+        
+        Векторы хранятся в int8 с масштабом на вектор - в 4 раза меньше памяти, чем float32;
+        на нормированных векторах ошибка квантования почти не меняет порядок результатов.
+        """
+        if not 0 < self.collection.count() <= FLAT_INDEX_MAX_DOCUMENTS:
+            return None
+        
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.ascontiguousarray(data["embeddings"], dtype=np.float32)
+        # Документы, сохраненные до нормировки при загрузке, приводятся к единичной длине здесь
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales, list(data["documents"]), [metadata or {} for metadata in data["metadatas"]]
+    
+    @staticmethod
+    def _search_flat(flat_index: _FlatIndex, query_vectors: np.ndarray,
+                     limit: int, max_difficulty: Optional[int] = None) -> List[List[Dict]]:
+        """Top-k по косинусной близости для каждого запроса; max_difficulty - аналог where $lte в Chroma"""
+        _, _, documents, metadatas = flat_index
+        return [
+            [{"content": documents[i], "metadata": metadatas[i]} for i in row]
+            for row in KnowledgeBase._flat_top(flat_index, query_vectors, limit, max_difficulty)
+        ]
+    
+    @staticmethod
+    def _flat_top(flat_index: _FlatIndex, query_vectors: np.ndarray,
+                  limit: int, max_difficulty: Optional[int] = None) -> np.ndarray:
+        """Индексы top-k документов для каждого запроса (строка на запрос)"""
+        codes, scales, _, metadatas = flat_index
+        scores = (np.ascontiguousarray(query_vectors, dtype=np.float32) @ codes.T) * scales
+        
+        if max_difficulty is not None:
+            allowed = np.array([
+                "difficulty" in metadata and metadata["difficulty"] <= max_difficulty
+                for metadata in metadatas
+            ])
+            scores[:, ~allowed] = -np.inf
+            limit = min(limit, int(allowed.sum()))
+        
+        return np.argsort(-scores, axis=1, kind="stable")[:, :limit]
+    
+    async def averify_technical_answer(self, question: str, answer: str, topic: str = None) -> Dict:
+        """Асинхронная версия verify_technical_answer (поиск выполняется в отдельном потоке)"""
+        return await asyncio.to_thread(self.verify_technical_answer, question, answer, topic)
+    
+    def _encode_documents(self, documents: List[str]) -> List[List[float]]:
+        """Нормированные эмбеддинги документов для Chroma: при единичной длине векторов
+        ранжирование по расстоянию совпадает с косинусной близостью
+        """
+        return self.embedding_model.encode(
+            documents,
+            batch_size=DOCUMENT_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).tolist()
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Нормированные эмбеддинги текстов: косинусная близость считается простым скалярным произведением"""
+        return self._encode(texts)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Нормированные эмбеддинги текстов с кэшем: тексты, которых нет в кэше, считаются одним пакетным вызовом модели.
+        
+        Возвращается C-непрерывная матрица float32, которую numpy и Chroma принимают без копирования.
+        """
+        keys = [hashlib.blake2b(text.encode("utf-8")).digest() for text in texts]
+        
+        vectors = {}
+        for key in keys:
+            vector = self._embedding_cache.get(key)
+            if vector is not None:
+                vectors[key] = vector
+        
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            encoded = self.embedding_model.encode(
+                list(missing.values()),
+                batch_size=EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            vectors.update(zip(missing, encoded))
+            
+            for key in missing:
+                self._embedding_cache.put(key, vectors[key])
+        
+        return np.ascontiguousarray(np.stack([vectors[key] for key in keys]), dtype=np.float32)
+    
+    def get_learning_resources(self, topic: str, difficulty: int = 2, limit: int = 3) -> List[Dict]:
+        """Подбирает материалы из базы знаний для изучения темы"""
+        return self.get_learning_resources_batch([topic], difficulty, limit).get(topic, [])
+    
+    def get_learning_resources_batch(self, topics: List[str], difficulty: int = 2,
+                                     limit: int = 3) -> Dict[str, List[Dict]]:
+        """Подбирает материалы сразу для нескольких тем.
+        
+        На каждую пачку из LEARNING_RESOURCES_BATCH_SIZE тем - один вызов encode и один поиск по индексу.
+        """
+        resources = {}
+        flat_index = self._get_flat_index()
+        for start in range(0, len(topics), LEARNING_RESOURCES_BATCH_SIZE):
+            batch = topics[start:start + LEARNING_RESOURCES_BATCH_SIZE]
+            if flat_index is not None:
+                found = self._search_flat(flat_index, self._encode(batch), limit,
+                                          max_difficulty=max(difficulty, 1))
+                for topic, items in zip(batch, found):
+                    resources[topic] = [
+                        {"topic": item["metadata"].get("topic", topic), "content": item["content"]}
+                        for item in items
+                    ]
+                continue
+            
+            query_embeddings = self._encode(batch).tolist()
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=limit,
+                where={"difficulty": {"$lte": max(difficulty, 1)}}
+            )
+            
+            for topic, documents, metadatas in zip(batch, results["documents"], results["metadatas"]):
+                resources[topic] = [
+                    {"topic": metadata.get("topic", topic), "content": document}
+                    for document, metadata in zip(documents, metadatas)
+                ]
+        
+        return resources
+    
+    async def aget_learning_resources_batch(self, topics: List[str], difficulty: int = 2,
+                                            limit: int = 3) -> Dict[str, List[Dict]]:
+        """Асинхронная версия get_learning_resources_batch (поиск выполняется в отдельном потоке)"""
+        return await asyncio.to_thread(self.get_learning_resources_batch, topics, difficulty, limit)
+    
+    def try_get_learning_resources_batch(self, topics: List[str], difficulty: int = 2,
+                                         limit: int = 3) -> Optional[Dict[str, List[Dict]]]:
+        """Как get_learning_resources_batch, но при ошибке возвращает None вместо исключения.
+        
+        После MAX_CONSECUTIVE_FAILURES ошибок подряд база FAILURE_COOLDOWN_SECONDS не опрашивается
+        и сразу возвращается None; затем пропускается один пробный запрос, и при успехе счетчик сбрасывается.
+        """
+        if not self._allow_request():
+            return None
+        
+        try:
+            resources = self.get_learning_resources_batch(topics, difficulty, limit)
+        except Exception as e:
+            with self._collection_lock:
+                self._consecutive_failures += 1
+                self._last_failure_at = time.monotonic()
+            logger.warning("Ошибка при поиске материалов: %s", e)
+            return None
+        
+        with self._collection_lock:
+            self._consecutive_failures = 0
+        return resources
+    
+    def _allow_request(self) -> bool:
+        """Можно ли обратиться к базе: ошибок подряд меньше предела или прошла пауза после последней"""
+        with self._collection_lock:
+            if self._consecutive_failures < MAX_CONSECUTIVE_FAILURES:
+                return True
+            now = time.monotonic()
+            if now - self._last_failure_at < FAILURE_COOLDOWN_SECONDS:
+                return False
+            # Пробный запрос: остальные ждут его результата еще одну паузу
+            self._last_failure_at = now
+            return True
+    
+    async def atry_get_learning_resources_batch(self, topics: List[str], difficulty: int = 2,
+                                                limit: int = 3) -> Optional[Dict[str, List[Dict]]]:
+        """Асинхронная версия try_get_learning_resources_batch"""
+        return await asyncio.to_thread(self.try_get_learning_resources_batch, topics, difficulty, limit)
+    
+    def add_custom_knowledge(self, documents: List[str], metadatas: List[Dict]):
+        """Добавить кастомные знания в базу"""
+        embeddings = self._encode_documents(documents)
+        # Уникальные id без выгрузки всей коллекции ради подсчета документов
+        ids = [f"custom_{uuid.uuid4().hex}" for _ in documents]
+        
+        self.collection.add(
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+        logger.info("Добавлено %s кастомных документов", len(documents))
+        
+        # Содержимое базы изменилось - сохраненные результаты устарели
+        self._cag_contexts = None
+        self._flat_index_ready = False
+        self._verification_cache.clear()
\ No newline at end of file
@@ -1,81 +1,157 @@
-from typing import TypedDict, List, Dict, Optional, Annotated, Any
-from pydantic import BaseModel, Field
-from datetime import datetime
-import operator
-
-
-class Message(BaseModel):
-    role: str  # "user", "interviewer", "observer", "coordinator"
-    content: str
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
-    metadata: Optional[Dict] = None
-
-class CandidateInfo(BaseModel):
-    name: str = "Анонимный кандидат"
-    position: str
-    grade: str
-    experience_years: float
-    technologies: List[str] = []
-
-class Assessment(BaseModel):
-    technical_score: float = 0.0
-    communication_score: float = 0.0
-    confidence_score: float = 0.0
-    topics_covered: List[str] = []
-    confirmed_skills: List[str] = []
-    knowledge_gaps: Dict[str, str] = {}  # тема -> правильный ответ
-    soft_skills_notes: List[str] = []
-
-class InterviewState(TypedDict):
-    candidate_info: CandidateInfo
-    messages: List[Message]
-    internal_monologue: List[str]
-    current_topic: str
-    difficulty_level: int
-    assessment: Assessment
-    questions_asked: List[str]
-    observer_recommendation: Optional[str]
-    need_feedback: bool
-    interview_complete: bool
-    current_agent: str
-    current_question: Optional[str]
-    current_answer: Optional[str]
-    coordinator_instruction: Optional[str]
-    log_data: Dict[str, Any]
-    current_turn_thoughts: List[str]
-    scenario_number: int
-
-# Для аннотации в LangGraph
-def add_message(messages: List[Message], message: Message) -> List[Message]:
-    return messages + [message]
-
-class StateManager:
-    @staticmethod
-    def get_conversation_history(state: InterviewState, last_n: int = 6) -> str:
-        """Получить историю диалога для промпта"""
-        history = []
-        for msg in state["messages"][-last_n:]:
-            if msg.role == "user":
-                history.append(f"Кандидат: {msg.content}")
-            elif msg.role == "interviewer":
-                history.append(f"Интервьюер: {msg.content}")
-        return "\n".join(history)
-    
-    @staticmethod
-    def get_internal_thoughts(state: InterviewState) -> str:
-        """Получить внутренние мысли для логов"""
-        return " | ".join(state["internal_monologue"][-3:])
-
-def validate_state(state: InterviewState) -> bool:
-    """Проверяет, что состояние содержит все необходимые поля"""
-    required_fields = [
-        "candidate_info", "messages", "assessment", 
-        "current_topic", "difficulty_level", "questions_asked"
-    ]
-    
-    for field in required_fields:
-        if field not in state:
-            print(f"В состоянии отсутствует поле: {field}")
-            return False
-    
+from typing import TypedDict, List, Dict, Optional, Annotated, Any, Set
+from pydantic import BaseModel, ConfigDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import cached_property
+import logging
+import operator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Message:
+    # Сообщения создаются только кодом графа, поэтому валидация pydantic им не нужна.
+    # История только дописывается: сообщение после создания не меняется,
+    # поэтому копии состояния могут безопасно делить одни и те же объекты
+    role: str  # "user", "interviewer", "observer", "coordinator"
+    content: str
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    metadata: Optional[Dict] = None
+
+class CandidateInfo(BaseModel):
+    # Данные кандидата не меняются в течение интервью
+    model_config = ConfigDict(frozen=True)
+    
+    name: str = "Анонимный кандидат"
+    position: str
+    grade: str
+    experience_years: float
+    technologies: List[str] = []
+    
+    @cached_property
+    def technologies_str(self) -> str:
+        """Все технологии кандидата одной строкой"""
+        return ", ".join(self.technologies)
+    
+    @cached_property
+    def technologies_top5_str(self) -> str:
+        """Первые 5 технологий кандидата одной строкой"""
+        return ", ".join(self.technologies[:5])
+    
+    @cached_property
+    def profile_str(self) -> str:
+        """Блок о кандидате для промптов: собирается один раз за интервью"""
+        return (
+            f"Кандидат: {self.name}\n"
+            f"Позиция: {self.position} ({self.grade})\n"
+            f"Опыт: {self.experience_years} лет\n"
+            f"Технологии кандидата: {self.technologies_str}"
+        )
+
+class Assessment(BaseModel):
+    technical_score: float = 0.0
+    communication_score: float = 0.0
+    confidence_score: float = 0.0
+    topics_covered: List[str] = []
+    confirmed_skills: List[str] = []
+    knowledge_gaps: Dict[str, str] = {}  # тема -> правильный ответ
+    soft_skills_notes: List[str] = []
+
+# total=False: узлы возвращают частичные обновления, а поля читаются через state.get(...)
+class InterviewState(TypedDict, total=False):
+    candidate_info: CandidateInfo
+    # Узлы графа возвращают только новые сообщения/вопросы - LangGraph дописывает их через operator.add.
+    # Редьюсер не должен менять список на месте: LangGraph повторно применяет записи узла
+    # к копии чекпоинта, которая делит с каналом те же списки, и история бы задвоилась
+    messages: Annotated[List[Message], operator.add]
+    internal_monologue: List[str]
+    current_topic: str
+    difficulty_level: int
+    assessment: Assessment
+    questions_asked: Annotated[List[str], operator.add]
+    questions_asked_set: Set[str]  # те же вопросы, для проверки повтора за O(1)
+    observer_recommendation: Optional[str]
+    need_feedback: bool
+    interview_complete: bool
+    current_agent: str
+    current_question: Optional[str]
+    current_answer: Optional[str]
+    coordinator_instruction: Optional[str]
+    log_data: Dict[str, Any]
+    current_turn_thoughts: List[str]
+    scenario_number: int
+    history_cache: Dict[str, Any]  # {"length": число сообщений, "by_last_n": {last_n: история для промпта}}
+
+# Подписи ролей в истории диалога; сообщения других ролей в историю не попадают
+ROLE_LABELS = {"user": "Кандидат", "interviewer": "Интервьюер"}
+
+# Сколько последних внутренних заметок гарантированно хранится в состоянии (в логи идут последние 3)
+INTERNAL_MONOLOGUE_LIMIT = 32
+
+class StateManager:
+    @staticmethod
+    def get_conversation_history(state: InterviewState, last_n: int = 6) -> str:
+        """Получить историю диалога для промпта.
+        
+        Результат кэшируется в состоянии: пока не добавлено новое сообщение,
+        координатор и интервьюер получают одну и ту же уже собранную строку.
+        """
+        messages = state.get("messages") or []
+        cache = state.get("history_cache")
+        
+        # Сообщения только добавляются, поэтому кэш для другой длины устарел
+        if not cache or cache["length"] != len(messages):
+            cache = state["history_cache"] = {"length": len(messages), "by_last_n": {}}
+        elif last_n in cache["by_last_n"]:
+            return cache["by_last_n"][last_n]
+        
+        cache["by_last_n"][last_n] = "\n".join(
+            f"{ROLE_LABELS[msg.role]}: {msg.content}"
+            for msg in messages[-last_n:]
+            if msg.role in ROLE_LABELS
+        )
+        return cache["by_last_n"][last_n]
+    
+    @staticmethod
+    def record_question(state: InterviewState, question: str) -> Dict[str, Any]:
+        """Обновление состояния для заданного вопроса: список (порядок) дополняется редьюсером,
+        множество (быстрая проверка повтора) пополняется на месте
+        """
+        asked_set = state.get("questions_asked_set")
+        if asked_set is None:
+            asked_set = set(state.get("questions_asked", []))
+        asked_set.add(question)
+        return {"questions_asked": [question], "questions_asked_set": asked_set}
+    
+    @staticmethod
+    def add_internal_thought(state: InterviewState, thought: str) -> None:
+        """Дописывает внутреннюю заметку, не давая internal_monologue расти все интервью.
+        
+        Старые заметки отбрасываются пачкой, когда список вырастает вдвое, -
+        добавление остается O(1) в среднем.
+        """
+        monologue = state.setdefault("internal_monologue", [])
+        monologue.append(thought)
+        if len(monologue) >= 2 * INTERNAL_MONOLOGUE_LIMIT:
+            del monologue[:-INTERNAL_MONOLOGUE_LIMIT]
+    
+    @staticmethod
+    def get_internal_thoughts(state: InterviewState) -> str:
+        """Получить внутренние мысли для логов"""
+        return " | ".join(state.get("internal_monologue", [])[-3:])
+
+# Поля, без которых состояние интервью считается неполным
+_REQUIRED_STATE_FIELDS = frozenset({
+    "candidate_info", "messages", "assessment",
+    "current_topic", "difficulty_level", "questions_asked"
+})
+
+def validate_state(state: InterviewState) -> bool:
+    """Проверяет, что состояние содержит все необходимые поля"""
+    missing = _REQUIRED_STATE_FIELDS - state.keys()
+    if missing:
+        logger.warning("В состоянии отсутствуют поля: %s", ", ".join(sorted(missing)))
+        return False
+    
     return True
\ No newline at end of file
@@ -1,149 +1,210 @@
-# main.py
-#!/usr/bin/env python3
-"""
-Multi-Agent Interview Coach System
-Система технического интервью с несколькими AI агентами
-"""
-
-import os
-import sys
-from pathlib import Path
-import warnings
-
-# Отключаем предупреждения HF Hub
-os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
-os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
-warnings.filterwarnings("ignore", message=".*unauthenticated requests.*")
-
-current_dir = Path(__file__).parent
-sys.path.insert(0, str(current_dir))
-
-from core.state import CandidateInfo
-from core.graph import InterviewWorkflow
-from config.settings import settings
-import argparse
-
-def collect_candidate_info() -> CandidateInfo:
-    """Сбор информации о кандидате"""
-    print("\n" + "="*60)
-    print("ВВЕДИТЕ ИНФОРМАЦИЮ О КАНДИДАТЕ")
-    print("="*60)
-    
-    name = input("Имя кандидата (или Enter для анонимного): ").strip() or "Анонимный кандидат"
-    position = input("Позиция (например, Python Developer): ").strip() or "Python Developer"
-    
-    print("\nУровень (grade):")
-    print("  1. Junior")
-    print("  2. Middle")
-    print("  3. Senior")
-    
-    grade_choice = input("Выберите уровень (1-3): ").strip()
-    grade_map = {"1": "Junior", "2": "Middle", "3": "Senior"}
-    grade = grade_map.get(grade_choice, "Middle")
-    
-    try:
-        experience = float(input("Опыт работы (лет): ").strip() or "2.0")
-    except ValueError:
-        experience = 2.0
-    
-    technologies_input = input("Технологии (через запятую): ").strip()
-    technologies = [tech.strip() for tech in technologies_input.split(",") if tech.strip()]
-    
-    if not technologies:
-        technologies = ["Python", "SQL", "Git"]
-    
-    return CandidateInfo(
-        name=name,
-        position=position,
-        grade=grade,
-        experience_years=experience,
-        technologies=technologies
-    )
-
-def check_environment():
-    """Проверка настроек окружения"""
-    print("\n" + "="*60)
-    print("ПРОВЕРКА НАСТРОЕК")
-    print("="*60)
-    
-    # Выводим информацию о настройках
-    print(settings)
-    
-    if not settings.MISTRAL_API_KEY:
-        print("\n MISTRAL_API_KEY не найден в .env файле!")
-        print("Добавьте в файл .env:")
-        print("MISTRAL_API_KEY=ваш_ключ_здесь")
-        print("\nПолучите API ключ на: https://console.mistral.ai/api-keys/")
-        
-        # Пробуем найти ключ в переменных окружения
-        api_key_from_env = os.getenv("MISTRAL_API_KEY")
-        if api_key_from_env:
-            print(f"\n Найден ключ в переменных окружения, обновляю настройки...")
-            settings.MISTRAL_API_KEY = api_key_from_env
-            print(" Ключ загружен из переменных окружения")
-            return True
-        
-        use_demo = input("\nПродолжить в демо-режиме (с ограниченной функциональностью)? (y/n): ").lower()
-        if use_demo != 'y':
-            return False
-        
-        print(" Продолжаем в демо-режиме...")
-        return True
-    
-    print(" Все настройки корректны")
-    return True
-
-def main():
-    """Основная функция"""
-    parser = argparse.ArgumentParser(description='Multi-Agent Interview Coach System')
-    parser.add_argument('--demo', action='store_true', help='Демо-режим (без реального AI)')
-    args = parser.parse_args()
-    
-    print("Система технического интервью с несколькими AI агентами")
-    print("\nАгенты:")
-    print("  • Coordinator - управляет процессом")
-    print("  • Interviewer - задает вопросы")
-    print("  • Observer - анализирует ответы")
-    print("  • Feedback Generator - дает финальный фидбэк")
-    
-    if not check_environment():
-        print("\n Не удалось инициализировать настройки")
-        print("Создайте файл .env с вашим API ключом")
-        return
-    
-    if args.demo:
-        print("\n  Включен демо-режим - AI функции будут ограничены")
-    
-    # Собираю информацию о кандидате
-    candidate_info = collect_candidate_info()
-    
-    print("\n" + "="*60)
-    print("СВОДКА НАСТРОЕК")
-    print("="*60)
-    print(f"Кандидат: {candidate_info.name}")
-    print(f"Позиция: {candidate_info.position}")
-    print(f"Уровень: {candidate_info.grade}")
-    print(f"Опыт: {candidate_info.experience_years} лет")
-    print(f"Технологии: {', '.join(candidate_info.technologies)}")
-    print(f"Режим: {'Демо' if args.demo or not settings.MISTRAL_API_KEY else 'Полный'}")
-    print("="*60)
-    
-    confirm = input("\nНачать интервью? (y/n): ").lower()
-    if confirm != 'y':
-        print("\n Интервью отменено")
-        return
-    
-    # Запускаем workflow
-    workflow = InterviewWorkflow()
-    
-    try:
-        workflow.run(candidate_info)
-    except KeyboardInterrupt:
-        print("\n\n Интервью прервано. До свидания!")
-    except Exception as e:
-        print(f"\n Критическая ошибка во время интервью: {e}")
-        import traceback
-        traceback.print_exc()
-
-if __name__ == "__main__":
+# main.py
+#!/usr/bin/env python3
+"""
+Multi-Agent Interview Coach System
+Система технического интервью с несколькими AI агентами
+"""
+
+import logging
+import os
+import sys
+import threading
+from pathlib import Path
+import warnings
+
+# Отключаем предупреждения HF Hub
+os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
+os.environ["HF_HUB_DISABLE_PROGRESS_BARS"] = "1"
+warnings.filterwarnings("ignore", message=".*unauthenticated requests.*")
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from core.state import CandidateInfo
+from core.graph import InterviewWorkflow
+from core.rag import get_encoder
+from config.settings import settings
+import argparse
+
+logger = logging.getLogger(__name__)
+
+# Варианты уровня: номер из меню -> grade
+GRADE_MAP = {"1": "Junior", "2": "Middle", "3": "Senior"}
+
+def build_candidate_info(name: str, position: str, grade: str,
+                         experience: str, technologies: str) -> CandidateInfo:
+    """Собирает CandidateInfo из введенных строк, подставляя значения по умолчанию"""
+    grade = grade.strip()
+    if grade.capitalize() in GRADE_MAP.values():
+        grade = grade.capitalize()
+    else:
+        grade = GRADE_MAP.get(grade, "Middle")
+    
+    try:
+        experience_years = float(experience.strip() or "2.0")
+    except ValueError:
+        experience_years = 2.0
+    
+    technologies_list = [tech.strip() for tech in technologies.split(",") if tech.strip()]
+    
+    return CandidateInfo(
+        name=name.strip() or "Анонимный кандидат",
+        position=position.strip() or "Python Developer",
+        grade=grade,
+        experience_years=experience_years,
+        technologies=technologies_list or ["Python", "SQL", "Git"]
+    )
+
+def read_candidate_block(first_line: str) -> CandidateInfo:
+    """Данные кандидата одним блоком строк key=value до пустой строки (для запуска через pipe).
+    
+    Ключи: name, position, grade (1-3 или Junior/Middle/Senior), experience, technologies.
+    Остальной stdin не читается - дальше по нему идут подтверждение и ответы кандидата.
+    """
+    fields = {}
+    line = first_line
+    while line.strip():
+        key, _, value = line.partition("=")
+        fields[key.strip().lower()] = value
+        line = sys.stdin.readline()
+    
+    return build_candidate_info(
+        fields.get("name", ""),
+        fields.get("position", ""),
+        fields.get("grade", ""),
+        fields.get("experience", ""),
+        fields.get("technologies", "")
+    )
+
+def collect_candidate_info() -> CandidateInfo:
+    """Сбор информации о кандидате"""
+    print("\n" + "="*60)
+    print("ВВЕДИТЕ ИНФОРМАЦИЮ О КАНДИДАТЕ")
+    print("="*60)
+    
+    name_prompt = "Имя кандидата (или Enter для анонимного): "
+    if sys.stdin.isatty():
+        name = input(name_prompt)
+    else:
+        # Без терминала данные можно передать одним блоком key=value вместо шести ответов
+        first_line = sys.stdin.readline()
+        if "=" in first_line:
+            return read_candidate_block(first_line)
+        print(name_prompt, end="")
+        name = first_line
+    
+    position = input("Позиция (например, Python Developer): ")
+    
+    print("\nУровень (grade):")
+    print("  1. Junior")
+    print("  2. Middle")
+    print("  3. Senior")
+    
+    grade_choice = input("Выберите уровень (1-3): ")
+    experience = input("Опыт работы (лет): ")
+    technologies = input("Технологии (через запятую): ")
+    
+    return build_candidate_info(name, position, grade_choice, experience, technologies)
+
+def warm_up_encoder():
+    """Загружает модель эмбеддингов в фоне, пока пользователь вводит данные кандидата"""
+    try:
+        get_encoder()
+    except Exception as e:
+        # При первом обращении к базе знаний загрузка повторится и ошибка будет обработана там
+        logger.debug("Не удалось заранее загрузить модель эмбеддингов: %s", e)
+
+def check_environment():
+    """Проверка настроек окружения"""
+    print("\n" + "="*60)
+    print("ПРОВЕРКА НАСТРОЕК")
+    print("="*60)
+    
+    # Выводим информацию о настройках
+    print(settings)
+    
+    if not settings.MISTRAL_API_KEY:
+        print("\n MISTRAL_API_KEY не найден в .env файле!")
+        print("Добавьте в файл .env:")
+        print("MISTRAL_API_KEY=ваш_ключ_здесь")
+        print("\nПолучите API ключ на: https://console.mistral.ai/api-keys/")
+        
+        # Пробуем найти ключ в переменных окружения
+        api_key_from_env = os.getenv("MISTRAL_API_KEY")
+        if api_key_from_env:
+            print(f"\n Найден ключ в переменных окружения, обновляю настройки...")
+            settings.MISTRAL_API_KEY = api_key_from_env
+            print(" Ключ загружен из переменных окружения")
+            return True
+        
+        use_demo = input("\nПродолжить в демо-режиме (с ограниченной функциональностью)? (y/n): ").lower()
+        if use_demo != 'y':
+            return False
+        
+        print(" Продолжаем в демо-режиме...")
+        return True
+    
+    print(" Все настройки корректны")
+    return True
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description='Multi-Agent Interview Coach System')
+    parser.add_argument('--demo', action='store_true', help='Демо-режим (без реального AI)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(name)s: %(message)s")
+    
+    print("Система технического интервью с несколькими AI агентами")
+    print("\nАгенты:")
+    print("  • Coordinator - управляет процессом")
+    print("  • Interviewer - задает вопросы")
+    print("  • Observer - анализирует ответы")
+    print("  • Feedback Generator - дает финальный фидбэк")
+    
+    if not check_environment():
+        print("\n Не удалось инициализировать настройки")
+        print("Создайте файл .env с вашим API ключом")
+        return
+    
+    if args.demo:
+        print("\n  Включен демо-режим - AI функции будут ограничены")
+    
+    # Модель грузится несколько секунд - параллельно с вводом данных кандидата
+    warm_up = threading.Thread(target=warm_up_encoder, daemon=True)
+    warm_up.start()
+    
+    # Собираю информацию о кандидате
+    candidate_info = collect_candidate_info()
+    
+    print("\n" + "="*60)
+    print("СВОДКА НАСТРОЕК")
+    print("="*60)
+    print(f"Кандидат: {candidate_info.name}")
+    print(f"Позиция: {candidate_info.position}")
+    print(f"Уровень: {candidate_info.grade}")
+    print(f"Опыт: {candidate_info.experience_years} лет")
+    print(f"Технологии: {candidate_info.technologies_str}")
+    print(f"Режим: {'Демо' if args.demo or not settings.MISTRAL_API_KEY else 'Полный'}")
+    print("="*60)
+    
+    confirm = input("\nНачать интервью? (y/n): ").lower()
+    if confirm != 'y':
+        print("\n Интервью отменено")
+        return
+    
+    # Запускаем workflow
+    warm_up.join()
+    workflow = InterviewWorkflow()
+    
+    try:
+        workflow.run(candidate_info)
+    except KeyboardInterrupt:
+        print("\n\n Интервью прервано. До свидания!")
+    except Exception as e:
+        print(f"\n Критическая ошибка во время интервью: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
     main()
\ No newline at end of file